@@ -0,0 +1,264 @@
+import hashlib
+import urllib.parse
+from functools import cache
+from collections import OrderedDict
+from collections.abc import Callable
+from typing import Literal
+from .common import (
+    os,
+    Gio,
+    GLib,
+    GdkPixbuf,
+    logger,
+)
+from .snippets.imaging import get_image_decoder
+
+ALBUM_ART_CACHE_PATH = os.path.expanduser("~/.cache/fabrika/album-art")
+ALBUM_ART_VARIANTS = {"bar": 24, "dashboard": 128}  # px, square
+ALBUM_ART_MEMORY_ITEMS = 48  # decoded variants kept around
+ALBUM_ART_DISK_SIZE = 32 * 1024 * 1024  # downscaled variants on disk
+ALBUM_ART_MAX_FILE_SIZE = 32 * 1024 * 1024  # anything bigger isn't album art
+MPRIS_BUS_PREFIX = "org.mpris.MediaPlayer2."
+MPRIS_OBJECT_PATH = "/org/mpris/MediaPlayer2"
+MPRIS_TRACKLIST_INTERFACE = "org.mpris.MediaPlayer2.TrackList"
+
+AlbumArtVariant = Literal["bar", "dashboard"]
+AlbumArtCallback = Callable[[GdkPixbuf.Pixbuf | None], None]
+
+
+def resolve_art_url(url: str) -> str | None:
+    """Turns an `mpris:artUrl` into a local path, remote urls aren't supported"""
+    if url.startswith("file://"):
+        url = urllib.parse.unquote(urllib.parse.urlparse(url).path)
+    if not url.startswith("/") or not os.path.isfile(url):
+        return None
+    return url
+
+
+def get_variant_path(content_hash: str, variant: AlbumArtVariant) -> str:
+    return f"{ALBUM_ART_CACHE_PATH}/{content_hash}-{ALBUM_ART_VARIANTS[variant]}.png"
+
+
+def load_art_variants(path: str) -> tuple[str, dict[str, GdkPixbuf.Pixbuf]] | None:
+    # worker side, one read for the hash and at most one full decode for all variants
+    if os.path.getsize(path) > ALBUM_ART_MAX_FILE_SIZE:
+        return None
+    with open(path, "rb") as f:
+        data = f.read()
+    content_hash = hashlib.sha256(data).hexdigest()[:32]
+
+    variants: dict[str, GdkPixbuf.Pixbuf] = {}
+    missing: list[AlbumArtVariant] = []
+    for variant in ALBUM_ART_VARIANTS:
+        variant_path = get_variant_path(content_hash, variant)  # type: ignore
+        try:
+            variants[variant] = GdkPixbuf.Pixbuf.new_from_file(variant_path)
+            os.utime(variant_path)  # recently used, keep it around
+        except GLib.Error:
+            missing.append(variant)  # type: ignore
+
+    if missing:
+        largest = max(ALBUM_ART_VARIANTS[variant] for variant in missing)
+        loader = GdkPixbuf.PixbufLoader()
+        loader.connect(
+            "size-prepared",
+            lambda loader, width, height: loader.set_size(
+                *get_cover_size(width, height, largest)
+            ),
+        )
+        loader.write(data)
+        loader.close()
+        if (source := loader.get_pixbuf()) is None:
+            return None
+        source = crop_square(source)
+
+        for variant in missing:
+            size = ALBUM_ART_VARIANTS[variant]
+            pixbuf = variants[variant] = (
+                source
+                if source.get_width() == size
+                else source.scale_simple(size, size, GdkPixbuf.InterpType.BILINEAR)
+            )
+            pixbuf.savev(get_variant_path(content_hash, variant), "png", [], [])
+        trim_disk_cache()
+
+    return content_hash, variants
+
+
+def get_cover_size(width: int, height: int, size: int) -> tuple[int, int]:
+    # scale so the shorter side fills `size`, the rest gets cropped
+    scale = size / max(1, min(width, height))
+    return max(size, round(width * scale)), max(size, round(height * scale))
+
+
+def crop_square(pixbuf: GdkPixbuf.Pixbuf) -> GdkPixbuf.Pixbuf:
+    width, height = pixbuf.get_width(), pixbuf.get_height()
+    if width == height:
+        return pixbuf
+    size = min(width, height)
+    return pixbuf.new_subpixbuf((width - size) // 2, (height - size) // 2, size, size)
+
+
+def trim_disk_cache():
+    entries: list[tuple[float, int, str]] = []
+    total = 0
+    with os.scandir(ALBUM_ART_CACHE_PATH) as it:
+        for entry in it:
+            stat = entry.stat()
+            entries.append((stat.st_mtime, stat.st_size, entry.path))
+            total += stat.st_size
+    if total <= ALBUM_ART_DISK_SIZE:
+        return
+
+    # least recently used first
+    for _, size, path in sorted(entries):
+        os.remove(path)
+        if (total := total - size) <= ALBUM_ART_DISK_SIZE:
+            break
+    return
+
+
+class AlbumArtCache:
+    """
+    Resolves, decodes and downscales album art in a worker, decoded variants
+    are kept in a small memory cache and a size-capped disk cache keyed by
+    the art's content hash, so the same cover is only ever decoded once
+    """
+
+    def __init__(self):
+        os.makedirs(ALBUM_ART_CACHE_PATH, exist_ok=True)
+        # (path, mtime) -> content hash, so unchanged files aren't hashed again
+        self._hashes: dict[tuple[str, float], str] = {}
+        self._pixbufs: OrderedDict[tuple[str, str], GdkPixbuf.Pixbuf] = OrderedDict()
+        self._pending: dict[tuple[str, float], list[tuple[str, AlbumArtCallback]]] = {}
+        self._tracklists: dict[str, Gio.DBusProxy | None] = {}
+
+    def lookup(self, url: str, variant: AlbumArtVariant) -> GdkPixbuf.Pixbuf | None:
+        """Returns the art only if it's already decoded, never blocks on anything"""
+        if not (path := resolve_art_url(url)):
+            return None
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            return None
+        if not (content_hash := self._hashes.get(key)):
+            return None
+        if (pixbuf := self._pixbufs.get((content_hash, variant))) is not None:
+            self._pixbufs.move_to_end((content_hash, variant))
+        return pixbuf
+
+    def request(self, url: str, variant: AlbumArtVariant, callback: AlbumArtCallback):
+        """Calls `callback` with the art (or `None`), right away if it's cached"""
+        if not url or not (path := resolve_art_url(url)):
+            return callback(None)
+        if (pixbuf := self.lookup(url, variant)) is not None:
+            return callback(pixbuf)
+
+        try:
+            key = (path, os.path.getmtime(path))
+        except OSError:
+            return callback(None)
+        if (waiting := self._pending.get(key)) is not None:
+            waiting.append((variant, callback))
+            return
+
+        self._pending[key] = [(variant, callback)]
+        get_image_decoder().submit(
+            load_art_variants, lambda result: self.on_art_loaded(key, result), path
+        )
+        return
+
+    def prefetch(self, url: str):
+        return self.request(url, "bar", lambda _: None)
+
+    def on_art_loaded(
+        self,
+        key: tuple[str, float],
+        result: tuple[str, dict[str, GdkPixbuf.Pixbuf]] | None,
+    ):
+        waiting = self._pending.pop(key, [])
+        if result is None:
+            for _, callback in waiting:
+                callback(None)
+            return
+
+        content_hash, variants = result
+        if len(self._hashes) > ALBUM_ART_MEMORY_ITEMS * 8:
+            self._hashes.clear()  # cheap to rebuild, they're only hashes
+        self._hashes[key] = content_hash
+        for variant, pixbuf in variants.items():
+            self._pixbufs[(content_hash, variant)] = pixbuf
+            self._pixbufs.move_to_end((content_hash, variant))
+        while len(self._pixbufs) > ALBUM_ART_MEMORY_ITEMS:
+            self._pixbufs.popitem(last=False)
+
+        for variant, callback in waiting:
+            callback(variants.get(variant))
+        return
+
+    def prefetch_next(self, player_instance: str, track_id: str | None):
+        """Warms up the cache for the upcoming track, if the player has a TrackList"""
+        if not track_id:
+            return
+        if player_instance not in self._tracklists:
+            self._tracklists[player_instance] = None
+            return Gio.DBusProxy.new_for_bus(
+                Gio.BusType.SESSION,
+                Gio.DBusProxyFlags.NONE,
+                None,
+                MPRIS_BUS_PREFIX + player_instance,
+                MPRIS_OBJECT_PATH,
+                MPRIS_TRACKLIST_INTERFACE,
+                None,
+                self.on_tracklist_ready,
+                (player_instance, track_id),
+            )
+        if (proxy := self._tracklists[player_instance]) is None:
+            return
+
+        tracks = proxy.get_cached_property("Tracks")
+        tracks = tracks.unpack() if tracks is not None else []
+        if track_id not in tracks or (index := tracks.index(track_id)) + 1 >= len(
+            tracks
+        ):
+            return
+        proxy.call(
+            "GetTracksMetadata",
+            GLib.Variant("(ao)", ([tracks[index + 1]],)),
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+            self.on_next_track_metadata,
+        )
+        return
+
+    def on_tracklist_ready(self, _, result: Gio.AsyncResult, data: tuple[str, str]):
+        player_instance, track_id = data
+        try:
+            proxy = Gio.DBusProxy.new_for_bus_finish(result)
+        except GLib.Error as e:
+            return logger.debug(f"[AlbumArt] No tracklist for {player_instance}: {e}")
+        # the proxy gets created either way, no cached properties means no tracklist
+        if proxy.get_cached_property("Tracks") is None:
+            return
+        self._tracklists[player_instance] = proxy
+        return self.prefetch_next(player_instance, track_id)
+
+    def on_next_track_metadata(self, proxy: Gio.DBusProxy, result: Gio.AsyncResult):
+        try:
+            (tracks,) = proxy.call_finish(result).unpack()
+        except GLib.Error:
+            return
+        for metadata in tracks:
+            if url := metadata.get("mpris:artUrl"):
+                self.prefetch(url)
+        return
+
+    def forget_player(self, player_instance: str):
+        self._tracklists.pop(player_instance, None)
+        return
+
+
+@cache
+def get_album_art_cache() -> AlbumArtCache:
+    return AlbumArtCache()
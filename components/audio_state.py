@@ -0,0 +1,218 @@
+from functools import cache
+from collections import deque
+from .common import (
+    Audio,
+    Service,
+    Signal,
+    Property,
+    GLib,
+)
+
+AUDIO_WRITE_INTERVAL = 16  # ms, at most one write to the server per frame
+AUDIO_ECHO_TOLERANCE = 1.0  # volume comes back slightly off after a round trip
+AUDIO_MAX_ECHOES = 8
+
+
+class AudioDevice:
+    """
+    The handlers we hold on a single stream (so they can be released in one go)
+    and the volume writes we still owe it or expect to hear back from it
+    """
+
+    def __init__(self, stream, handlers: list[int]):
+        self.stream = stream
+        self.handlers = handlers
+        self.target: float | None = None  # not written yet
+        self.echoes: deque[float] = deque(maxlen=AUDIO_MAX_ECHOES)
+        self._flush_handler: int = 0
+
+    def set_volume(self, value: float):
+        # coalesced, only the latest value makes it to the server
+        self.target = value
+        if not self._flush_handler:
+            self._flush_handler = GLib.timeout_add(AUDIO_WRITE_INTERVAL, self.do_flush)
+        return
+
+    def do_flush(self) -> bool:
+        self._flush_handler = 0
+        if (target := self.target) is None:
+            return False
+        self.target = None
+        self.echoes.append(target)
+        self.stream.volume = target
+        return False
+
+    def is_echo(self, volume: float) -> bool:
+        # anything still pending will overwrite this anyway
+        if self.target is not None:
+            return True
+        while self.echoes:
+            if abs(self.echoes.popleft() - volume) <= AUDIO_ECHO_TOLERANCE:
+                return True
+        return False
+
+    def release(self):
+        if self._flush_handler:
+            GLib.source_remove(self._flush_handler)
+            self._flush_handler = 0
+        for handler in self.handlers:
+            self.stream.disconnect(handler)
+        self.handlers.clear()
+        return
+
+
+class AudioState(Service):
+    """
+    The one connection to the sound server, exposes a stable speaker and
+    microphone model that widgets subscribe to instead of the devices themselves
+    """
+
+    @Signal
+    def speaker_changed(self) -> None: ...
+
+    @Signal
+    def microphone_changed(self) -> None: ...
+
+    @Property(float, "read-write", default_value=0.0)
+    def speaker_volume(self) -> float:
+        return self._speaker_volume
+
+    @speaker_volume.setter
+    def speaker_volume(self, value: float):
+        if not self._speaker:
+            return
+        # the ui follows right away, the server catches up within a frame
+        self._speaker_volume = max(0.0, min(100.0, value))
+        self._speaker.set_volume(self._speaker_volume)
+        return
+
+    @Property(bool, "readable", default_value=False)
+    def speaker_muted(self) -> bool:
+        return self._speaker_muted
+
+    @Property(float, "read-write", default_value=0.0)
+    def microphone_volume(self) -> float:
+        return self._microphone_volume
+
+    @microphone_volume.setter
+    def microphone_volume(self, value: float):
+        if not self._microphone:
+            return
+        self._microphone_volume = max(0.0, min(100.0, value))
+        self._microphone.set_volume(self._microphone_volume)
+        return
+
+    @Property(bool, "readable", default_value=False)
+    def microphone_muted(self) -> bool:
+        return self._microphone_muted
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._speaker: AudioDevice | None = None
+        self._speaker_volume = 0.0
+        self._speaker_muted = False
+        self._microphone: AudioDevice | None = None
+        self._microphone_volume = 0.0
+        self._microphone_muted = False
+
+        self._audio = Audio(controller_name="fabrika")
+        self._audio.connect("notify::speaker", self.do_bind_speaker)
+        self._audio.connect("notify::microphone", self.do_bind_microphone)
+        self.do_bind_speaker()
+        self.do_bind_microphone()
+
+    @property
+    def speaker(self):
+        return self._speaker.stream if self._speaker else None
+
+    @property
+    def microphone(self):
+        return self._microphone.stream if self._microphone else None
+
+    def do_bind_speaker(self, *_):
+        if (stream := self._audio.speaker) is self.speaker:
+            return
+        if self._speaker:
+            self._speaker.release()
+        # exactly one set of handlers per device, gone once it's swapped out
+        self._speaker = (
+            AudioDevice(
+                stream,
+                [
+                    stream.connect("notify::volume", self.on_speaker_volume),
+                    stream.connect("notify::muted", self.on_speaker_muted),
+                ],
+            )
+            if stream
+            else None
+        )
+        # quietly, a new device isn't a volume change
+        self._speaker_volume = stream.volume if stream else 0.0
+        self._speaker_muted = bool(stream and stream.muted)
+        self.speaker_changed()
+        return
+
+    def do_bind_microphone(self, *_):
+        if (stream := self._audio.microphone) is self.microphone:
+            return
+        if self._microphone:
+            self._microphone.release()
+        self._microphone = (
+            AudioDevice(
+                stream,
+                [
+                    stream.connect("notify::volume", self.on_microphone_volume),
+                    stream.connect("notify::muted", self.on_microphone_muted),
+                ],
+            )
+            if stream
+            else None
+        )
+        self._microphone_volume = stream.volume if stream else 0.0
+        self._microphone_muted = bool(stream and stream.muted)
+        self.microphone_changed()
+        return
+
+    def on_speaker_volume(self, *_):
+        if not self._speaker:
+            return
+        volume = self._speaker.stream.volume
+        # our own writes coming back (rounded by the server), the ui already shows them
+        if (
+            self._speaker.is_echo(volume)
+            or abs(volume - self._speaker_volume) <= AUDIO_ECHO_TOLERANCE
+        ):
+            return
+        self._speaker_volume = volume
+        return self.notify("speaker-volume")
+
+    def on_speaker_muted(self, *_):
+        muted = bool(self.speaker and self.speaker.muted)
+        if muted == self._speaker_muted:
+            return
+        self._speaker_muted = muted
+        return self.notify("speaker-muted")
+
+    def on_microphone_volume(self, *_):
+        if not self._microphone:
+            return
+        volume = self._microphone.stream.volume
+        if (
+            self._microphone.is_echo(volume)
+            or abs(volume - self._microphone_volume) <= AUDIO_ECHO_TOLERANCE
+        ):
+            return
+        self._microphone_volume = volume
+        return self.notify("microphone-volume")
+
+    def on_microphone_muted(self, *_):
+        muted = bool(self.microphone and self.microphone.muted)
+        if muted == self._microphone_muted:
+            return
+        self._microphone_muted = muted
+        return self.notify("microphone-muted")
+
+
+@cache
+def get_audio_state() -> AudioState:
+    return AudioState()
@@ -0,0 +1,196 @@
+import re
+import time
+import math
+import itertools
+from functools import cache
+from collections.abc import Callable, Iterable
+from .common import (
+    Service,
+    Button,
+    Gdk,
+    GLib,
+)
+from .sleep_monitor import get_sleep_monitor
+
+CLOCK_SLACK = 0.005  # seconds past the boundary, so strftime surely sees the new value
+CLOCK_SECOND, CLOCK_MINUTE, CLOCK_HOUR, CLOCK_DAY = 1, 60, 60 * 60, 24 * 60 * 60
+CLOCK_DIRECTIVE = re.compile(r"%[-_0^#]?[EO]?(.)")
+# the smallest unit each strftime directive shows, anything else is a day or longer
+CLOCK_DIRECTIVE_UNITS = {
+    **dict.fromkeys("SsTXcr+", CLOCK_SECOND),
+    **dict.fromkeys("MR", CLOCK_MINUTE),
+    **dict.fromkeys("HIklpP", CLOCK_HOUR),
+}
+
+
+@cache
+def get_format_unit(format: str) -> int:
+    return min(
+        (
+            CLOCK_DIRECTIVE_UNITS.get(directive, CLOCK_DAY)
+            for directive in CLOCK_DIRECTIVE.findall(format)
+        ),
+        default=CLOCK_DAY,
+    )
+
+
+def get_next_boundary(unit: int, now: float) -> float:
+    if unit <= CLOCK_MINUTE:
+        # every timezone is offset by whole minutes, these line up everywhere
+        return (math.floor(now / unit) + 1) * unit
+
+    # hours and days follow the local timezone (and dst), let mktime figure that out
+    t = time.localtime(now)
+    if unit == CLOCK_HOUR:
+        parts = (t.tm_year, t.tm_mon, t.tm_mday, t.tm_hour + 1, 0, 0)
+    else:
+        parts = (t.tm_year, t.tm_mon, t.tm_mday + 1, 0, 0, 0)
+    return time.mktime((*parts, 0, 0, -1))
+
+
+class ClockSubscription:
+    __slots__ = ("format", "unit", "callback", "text")
+
+    def __init__(self, format: str, callback: Callable[[str], None]):
+        self.format = format
+        self.unit = get_format_unit(format)
+        self.callback = callback
+        self.text: str | None = None
+
+
+class ClockService(Service):
+    """
+    Formats the time for everything showing it, waking up only when some subscribed format
+    could actually change (once per boundary, no matter how many are subscribed to it)
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._subscriptions: dict[int, ClockSubscription] = {}
+        self._handles = itertools.count(1)
+        self._source: int = 0
+
+        # timeouts don't count the time spent asleep, resume means "look again"
+        get_sleep_monitor().connect("resumed", lambda *_: self.do_update(force=True))
+
+    def subscribe(self, format: str, callback: Callable[[str], None]) -> int:
+        """Calls `callback` with the formatted time right away and whenever it changes"""
+        handle = next(self._handles)
+        subscription = self._subscriptions[handle] = ClockSubscription(format, callback)
+        subscription.text = time.strftime(format)
+        callback(subscription.text)
+        self.do_arm()
+        return handle
+
+    def unsubscribe(self, handle: int):
+        if self._subscriptions.pop(handle, None) is None:
+            return
+        return self.do_arm()
+
+    def do_arm(self):
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+        if not self._subscriptions:
+            return
+
+        now = time.time()
+        boundary = min(
+            get_next_boundary(unit, now)
+            for unit in {s.unit for s in self._subscriptions.values()}
+        )
+        self._source = GLib.timeout_add(
+            max(math.ceil((boundary - now + CLOCK_SLACK) * 1000), 1), self.do_wake
+        )
+        return
+
+    def do_wake(self) -> bool:
+        self._source = 0
+        self.do_update()
+        return False
+
+    def do_update(self, force: bool = False):
+        texts: dict[str, str] = {}
+        for subscription in tuple(self._subscriptions.values()):
+            # formats shared between subscribers get formatted once
+            if (text := texts.get(subscription.format)) is None:
+                text = texts[subscription.format] = time.strftime(subscription.format)
+            if force or text != subscription.text:
+                subscription.text = text
+                subscription.callback(text)
+        return self.do_arm()
+
+
+@cache
+def get_clock_service() -> ClockService:
+    return ClockService()
+
+
+class Clock(Button):
+    """
+    A drop-in for fabric's `DateTime` that's driven by the shared `ClockService`,
+    it only stays subscribed while it's mapped
+    """
+
+    def __init__(
+        self,
+        formatters: str | Iterable[str] = ("%I:%M %p", "%A", "%m-%d-%Y"),
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._formatters = (
+            (formatters,) if isinstance(formatters, str) else tuple(formatters)
+        )
+        self._current_index = 0
+        self._handle: int = 0
+        self._service = get_clock_service()
+
+        self.add_events(Gdk.EventMask.SCROLL_MASK)
+        self.connect("button-press-event", self.do_handle_press)
+        self.connect("scroll-event", self.do_handle_scroll)
+        self.connect("map", lambda *_: self.do_subscribe())
+        self.connect("unmap", lambda *_: self.do_unsubscribe())
+
+        self.set_label(time.strftime(self._formatters[0]))
+
+    @property
+    def formatters(self) -> tuple[str, ...]:
+        return self._formatters
+
+    def do_subscribe(self):
+        self.do_unsubscribe()
+        self._handle = self._service.subscribe(
+            self._formatters[self._current_index], self.set_label
+        )
+        return
+
+    def do_unsubscribe(self):
+        if self._handle:
+            self._service.unsubscribe(self._handle)
+            self._handle = 0
+        return
+
+    def do_cycle(self, step: int):
+        self._current_index = (self._current_index + step) % len(self._formatters)
+        if not self.get_mapped():
+            return self.set_label(time.strftime(self._formatters[self._current_index]))
+        return self.do_subscribe()
+
+    def do_cycle_next(self):
+        return self.do_cycle(1)
+
+    def do_cycle_prev(self):
+        return self.do_cycle(-1)
+
+    def do_handle_press(self, _, event, *args):
+        if event.button == 1:
+            self.do_cycle_next()
+        return
+
+    def do_handle_scroll(self, _, event, *args):
+        match event.direction:
+            case Gdk.ScrollDirection.UP:
+                self.do_cycle_prev()
+            case Gdk.ScrollDirection.DOWN:
+                self.do_cycle_next()
+        return
@@ -33,8 +33,10 @@ from fabric.system_tray.widgets import SystemTray
 from components.snippets.clippingbox import ClippingBox
 from components.snippets.swipebutton import SwipeButton
 from components.snippets.animator import Animator, cubic_bezier, lerp
+from components.snippets.motion import get_frame_monitor, get_motion_policy
 from components.snippets.animatedscrollable import AnimatedScrollable
 from components.snippets.utils import (
+    HeightCache,
     multiply_height_for_child,
     get_children_height_limit,
     add_style_class_lazy,
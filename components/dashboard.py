@@ -1,5 +1,5 @@
-from fabric.widgets.datetime import DateTime
 from .common import Box, Label, exec_shell_command
+from .clock import Clock
 from .weather import Weather
 
 
@@ -9,8 +9,8 @@ class Dashboard(Box):
             orientation="v",
             name="clock-widget",
             children=[
-                DateTime(name="date", formatters="%A. %d %B", interval=10000),
-                DateTime(name="time", formatters="%I:%M"),
+                Clock(name="date", formatters="%A. %d %B"),
+                Clock(name="time", formatters="%I:%M"),
                 Label(
                     label=exec_shell_command("hyprctl splash")
                     or "hyprctl is not as bad as you might think. it's just slightly worse."
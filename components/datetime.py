@@ -1,68 +1,206 @@
-from playsound import playsound
-import multiprocessing
+import time
+from functools import cache
 from .common import (
-    Fabricator,
-    partial,
     Overlay,
     Widget,
     Label,
     Box,
     Gtk,
     Gdk,
-    Animator,
-    cubic_bezier,
+    Gio,
+    GLib,
+    logger,
     get_relative_path,
 )
-from fabric.widgets.datetime import DateTime as BasicDateTime
+from .sounds import SoundPlayback, get_sound_service
+from .timers import Timer, get_timer_service
+from .clock import Clock
 
 
 ALARM_SOUND_PATH = get_relative_path("./audio/alarm.mp3")
+ALARM_LOOPS = 16
+ALARM_NOTIFY_TIMEOUT = 5000  # ms, to wait on the notifications server before giving up
+NOTIFICATIONS_BUS_NAME = "org.freedesktop.Notifications"
+NOTIFICATIONS_OBJECT_PATH = "/org/freedesktop/Notifications"
 
 
 class TimerProgress(Gtk.ProgressBar, Widget):
-    def __init__(self, interval: float, **kwargs):
+    def __init__(self, timer: Timer, **kwargs):
         Gtk.ProgressBar.__init__(self)  # type: ignore
         Widget.__init__(self, **kwargs)
+        self.timer = timer
+        self._service = get_timer_service()
 
-        self._animator = Animator(
-            duration=interval,
-            timing_function=partial(cubic_bezier, 0, 0, 1, 1),
-            tick_widget=self,
-            on_finished=self.on_timer_done,
-            # TODO: add a way of identifing time left before dingy dongs
-            notify_value=lambda a, *_: self.set_fraction(a.value),
+        # the service wakes up once per pixel of this, not once per frame
+        self.connect(
+            "size-allocate",
+            lambda _, allocation: self._service.set_width(
+                timer.id, id(self), allocation.width
+            ),
         )
+        # a bar that's gone shouldn't keep the service ticking at its width
+        self.connect(
+            "destroy", lambda *_: self._service.unset_width(timer.id, id(self))
+        )
+        self._handlers = [
+            self._service.connect("timer-changed", self.on_timer_changed),
+            self._service.connect("timer-finished", self.on_timer_done),
+            self._service.connect("timer-removed", self.on_timer_done),
+        ]
+        self.set_fraction(timer.get_fraction(time.time()))
+
+    def on_timer_changed(self, _, timer: Timer):
+        if timer.id != self.timer.id:
+            return
+        return self.set_fraction(timer.get_fraction(time.time()))
+
+    def on_timer_done(self, _, timer: Timer):
+        if timer.id != self.timer.id:
+            return
+        for handler in self._handlers:
+            self._service.disconnect(handler)
+        self._handlers.clear()
+        self.hide()  # type: ignore
+        if p := self.get_parent():
+            p.remove(self)  # type: ignore
+        return self.destroy()  # type: ignore
 
-        self._animator.play()
 
-    @staticmethod  # BLOCKS MAIN THREAD. RUN IN A THREAD.
-    def do_play_alarm_sound():
-        for _ in range(16):
-            playsound(ALARM_SOUND_PATH, block=True)
+class TimerAlarm:
+    """
+    Rings once per finished timer, no matter how many bars are showing it, the "Stop"
+    action goes through the notification server (which is this very shell)
+    """
+
+    def __init__(self):
+        self._proxy: Gio.DBusProxy | None = None
+        self._proxy_failed = False
+        self._playbacks: dict[int, SoundPlayback] = {}  # by notification id
+        # ringing before there's anywhere to put a "Stop" button (e.g. missed timers
+        # firing right at startup, before our notifications server owns the name)
+        self._queued: list[SoundPlayback] = []
+        self._queue_timeout: int = 0
+        get_timer_service().connect("timer-finished", self.on_timer_finished)
+        Gio.DBusProxy.new_for_bus(
+            Gio.BusType.SESSION,
+            # it's us or nothing, don't go starting some other daemon
+            Gio.DBusProxyFlags.DO_NOT_LOAD_PROPERTIES
+            | Gio.DBusProxyFlags.DO_NOT_AUTO_START,
+            None,
+            NOTIFICATIONS_BUS_NAME,
+            NOTIFICATIONS_OBJECT_PATH,
+            NOTIFICATIONS_BUS_NAME,
+            None,
+            self.on_proxy_ready,
+        )
 
-    def on_timer_done(self, *_):
-        self._animator.pause()
+    def on_proxy_ready(self, _, result: Gio.AsyncResult):
+        try:
+            self._proxy = Gio.DBusProxy.new_for_bus_finish(result)
+        except GLib.Error as e:
+            logger.warning(f"[Timers] Alarms won't have a stop button: {e}")
+            self._proxy_failed = True
+            return self.do_give_up_queued()
+        self._proxy.connect("g-signal", self.on_notification_signal)
+        self._proxy.connect("notify::g-name-owner", lambda *_: self.do_flush_queued())
+        return self.do_flush_queued()
 
-        audio = multiprocessing.get_context("spawn").Process(
-            target=self.do_play_alarm_sound
+    def on_timer_finished(self, *_):
+        # with no way of stopping it, it only gets to ring once
+        playback = get_sound_service().play(
+            ALARM_SOUND_PATH, loops=1 if self._proxy_failed else ALARM_LOOPS
         )
-        audio.start()
-
-        def on_notification_interaction(*_):
-            audio.terminate()
-            self.hide()  # type: ignore
-            if p := self.get_parent():
-                p.remove(self)  # type: ignore
-            return self.destroy()  # type: ignore
-
-        Fabricator(
-            stream=True,
-            poll_from="dunstify 'Timer' --action='stop,Stop'",  # TODO: move to notify-send
-            notify_value=on_notification_interaction,
+        if self._proxy_failed:
+            return
+        if not self._proxy or not self._proxy.get_name_owner():
+            self._queued.append(playback)
+            if not self._queue_timeout:
+                self._queue_timeout = GLib.timeout_add(
+                    ALARM_NOTIFY_TIMEOUT, self.do_give_up_queued
+                )
+            return
+        return self.do_notify(playback)
+
+    def do_flush_queued(self):
+        if not self._proxy or not self._proxy.get_name_owner():
+            return
+        if self._queue_timeout:
+            GLib.source_remove(self._queue_timeout)
+            self._queue_timeout = 0
+        queued, self._queued = self._queued, []
+        for playback in queued:
+            if not playback.finished:
+                self.do_notify(playback)
+        return
+
+    def do_give_up_queued(self) -> bool:
+        self._queue_timeout = 0
+        queued, self._queued = self._queued, []
+        for playback in queued:
+            playback.loops = 1
+        return False
+
+    def do_notify(self, playback: SoundPlayback):
+        # async, a blocking call would wait on our own main loop to answer it
+        self._proxy.call(  # type: ignore
+            "Notify",
+            GLib.Variant(
+                "(susssasa{sv}i)",
+                (
+                    "fabrika",
+                    0,
+                    "alarm-symbolic",
+                    "Timer",
+                    "Time's up!",
+                    ["stop", "Stop"],
+                    {"urgency": GLib.Variant("y", 2)},
+                    0,  # never expires, it has to be stopped
+                ),
+            ),
+            Gio.DBusCallFlags.NONE,
+            -1,
+            None,
+            self.on_notified,
+            playback,
         )
+        return
+
+    def on_notified(self, proxy: Gio.DBusProxy, result: Gio.AsyncResult, playback):
+        try:
+            (notification_id,) = proxy.call_finish(result).unpack()
+        except GLib.Error as e:
+            playback.loops = 1
+            return logger.warning(f"[Timers] Couldn't send the alarm notification: {e}")
+        if not playback.finished:
+            self._playbacks[notification_id] = playback
+        return
+
+    def on_notification_signal(self, _, sender, signal_name: str, parameters):
+        if signal_name not in ("ActionInvoked", "NotificationClosed"):
+            return
+        # either "stop" got clicked or the notification went away, both mean silence
+        notification_id = parameters.unpack()[0]
+        if not (playback := self._playbacks.pop(notification_id, None)):
+            return
+        playback.stop()
+        if signal_name == "ActionInvoked" and self._proxy:
+            self._proxy.call(
+                "CloseNotification",
+                GLib.Variant("(u)", (notification_id,)),
+                Gio.DBusCallFlags.NONE,
+                -1,
+                None,
+                None,
+            )
+        return
 
 
-class DateTime(BasicDateTime):
+@cache
+def get_timer_alarm() -> TimerAlarm:
+    return TimerAlarm()
+
+
+class DateTime(Clock):
     def __init__(self, **kwargs):
         self._label = Label()
 
@@ -89,6 +227,13 @@ class DateTime(BasicDateTime):
 
         self.add(self._container)
 
+        get_timer_alarm()
+        self._timers = get_timer_service()
+        self._timers.connect("timer-added", lambda _, timer: self.do_add_timer(timer))
+        # timers that were running before a restart pick up where they were
+        for timer in self._timers.timers.values():
+            self.do_add_timer(timer)
+
     def set_label(self, label: str):
         return self._label.set_label(label)
 
@@ -96,8 +241,12 @@ class DateTime(BasicDateTime):
         return self._label.get_label()
 
     def do_start_timer(self, menu_item: Gtk.MenuItem, interval: int):
+        self._timers.start(interval)
+        return
+
+    def do_add_timer(self, timer: Timer):
         progress = TimerProgress(
-            interval=interval,
+            timer=timer,
             h_expand=True,
             v_align="end",
         )
@@ -1,4 +1,5 @@
 import re
+import time
 import urllib.parse
 from collections.abc import Iterator
 from .common import (
@@ -15,6 +16,7 @@ from .common import (
     DesktopApp,
     ClippingBox,
     AnimatedScrollable,
+    HeightCache,
     add_style_class_lazy,
     get_children_height_limit,
     get_desktop_applications,
@@ -22,14 +24,19 @@ from .common import (
     exec_shell_command,
     remove_handler,
     idle_add,
+    get_frame_monitor,
     GLib,
+    Gdk,
+    Gtk,
     Service,
 )
+from .notification_search import get_notification_index
 
 WALLPAPERS_PATH = os.path.expanduser("~/Pictures/Wallpapers/")
 WALLPAPERS_THUMBNAILS_PATH = os.path.expanduser("~/Pictures/Wallpapers/.thumbnails")
 WALLPAPERS_SETTER_COMMAND = os.path.expanduser("~/scripts/set_wallpaper.sh")
 WALLPAPERS_THUMBNAILS_SIZE = 256
+NOTIFICATIONS_QUERY_LIMIT = 20
 
 for path in (WALLPAPERS_PATH, WALLPAPERS_THUMBNAILS_PATH):
     if not os.path.exists(path):
@@ -216,6 +223,53 @@ class LauncherListsHandler(Service):
         self.post_wallpaper_cache_check(image_path, thumbnail_path)
         return True
 
+    def query_notifications(self, text: str) -> None:
+        if not text:
+            return self.done()
+        self.start("notifications")
+        index = get_notification_index()
+
+        for record_id in index.search(text, limit=NOTIFICATIONS_QUERY_LIMIT):
+            if not (record := index.get_record(record_id)):
+                continue
+            self.slot_ready(
+                Button(
+                    style_classes="app-slot",
+                    child=Box(
+                        orientation="v",
+                        children=[
+                            Label(
+                                label=f"{record.summary} · {record.app_name}",
+                                max_chars_width=42,
+                                ellipsization="end",
+                                v_align="start",
+                                h_align="start",
+                                style_classes="app-title",
+                            ),
+                            Label(
+                                label=record.body,
+                                max_chars_width=42,
+                                ellipsization="end",
+                                v_align="start",
+                                h_align="start",
+                                style_classes="app-description",
+                            ),
+                        ],
+                    ),
+                    tooltip_text=time.strftime(
+                        "%A. %d %B, %I:%M", time.localtime(record.timestamp)
+                    ),
+                    # copy it, probably that 2fa code
+                    on_clicked=lambda *_, body=record.body: (
+                        Gtk.Clipboard.get(Gdk.SELECTION_CLIPBOARD).set_text(body, -1),
+                        self.launched(),
+                    ),
+                ),
+                "notifications",
+            )
+
+        self.done()
+
     def query_google(self, text: str) -> None: ...
     def query_link(self, link: str) -> None: ...
 
@@ -231,10 +285,13 @@ class Launcher(Box):
         self._all_apps = get_desktop_applications()
 
         self.viewport = Box(spacing=4, orientation="v")
+        self.viewport_heights = HeightCache(self.viewport)
         self.max_children = 4
         self.command_parser = CommandParser(("!", "?", "/"))
         self.launch_handler = LauncherListsHandler(
-            on_start=lambda *_: self.header.add_style_class("shine"),
+            # the shine is pure eye-candy, skip it when we're dropping frames
+            on_start=lambda *_: not get_frame_monitor().degraded
+            and self.header.add_style_class("shine"),
             on_done=lambda *_: (
                 self.post_viewport_arrange(),
                 self.header.remove_style_class("shine"),
@@ -264,6 +321,7 @@ class Launcher(Box):
 
         self.scrolled_window = AnimatedScrollable(
             max_content_size=(280, 320),
+            animation_mode="clip",
             child=self.viewport,
             h_expand=True,
             v_expand=True,
@@ -276,6 +334,8 @@ class Launcher(Box):
             visible=False,
         )
         self.scrolled_window.connect("unmap", lambda: self.scrolled_clip.hide())
+        # the launcher's background follows the list, not its final size
+        self.scrolled_window.clip_background(self)
 
         self.children = self.header, self.scrolled_clip
 
@@ -299,6 +359,12 @@ class Launcher(Box):
                 )
                 self.launch_handler.query_wallpapers(query_text)
                 return
+            case "n":
+                self.header_icon.set_from_icon_name(
+                    "preferences-system-notifications-symbolic"
+                )
+                self.launch_handler.query_notifications(query_text)
+                return
             case "g":
                 self.header_icon.set_from_icon_name("google")
                 return
@@ -310,7 +376,9 @@ class Launcher(Box):
 
     def post_viewport_children(self):
         if (
-            new_hight := get_children_height_limit(self.viewport, self.max_children)
+            new_hight := get_children_height_limit(
+                self.viewport, self.max_children, cache=self.viewport_heights
+            )
         ) < 1:
             self.scrolled_window.animate_size(0)
             return False
@@ -319,6 +387,9 @@ class Launcher(Box):
         self.scrolled_window.show()
         self.scrolled_window.animate_size(new_hight)
 
+        if get_frame_monitor().degraded:
+            return
+
         for i, slot in enumerate(self.viewport.children, start=1):
             if i > 8:
                 break
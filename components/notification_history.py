@@ -0,0 +1,316 @@
+import json
+import queue
+import hashlib
+from functools import cache
+from collections import deque
+from collections.abc import Iterator
+from typing import NamedTuple
+from .common import (
+    os,
+    Service,
+    Signal,
+    Notification,
+    GdkPixbuf,
+    GLib,
+    logger,
+    idle_add,
+)
+
+HISTORY_PATH = os.path.expanduser("~/.cache/fabrika/notifications")
+HISTORY_LOG_PATH = HISTORY_PATH + "/history.log"
+HISTORY_IMAGES_PATH = HISTORY_PATH + "/images"
+HISTORY_MAX_RECORDS = 100_000  # older records are dropped on compaction
+HISTORY_MEMORY_RECORDS = 64  # most recent records kept in memory
+HISTORY_COMPACT_SIZE = 32 * 1024 * 1024  # compact once the log grows past this
+HISTORY_COMPACT_DEAD_RECORDS = 512  # ...or once this many records got removed
+HISTORY_READ_CHUNK_SIZE = 64 * 1024
+
+
+class HistoryRecord(NamedTuple):
+    id: int
+    timestamp: float
+    app_name: str
+    summary: str
+    body: str
+    actions: tuple[tuple[str, str], ...]
+    image: str | None  # file name inside `HISTORY_IMAGES_PATH`
+
+    def get_image_path(self) -> str | None:
+        return HISTORY_IMAGES_PATH + "/" + self.image if self.image else None
+
+    def serialize(self) -> bytes:
+        return (
+            json.dumps(
+                {
+                    "i": self.id,
+                    "t": self.timestamp,
+                    "a": self.app_name,
+                    "s": self.summary,
+                    "b": self.body,
+                    "x": self.actions,
+                    "m": self.image,
+                },
+                separators=(",", ":"),
+                ensure_ascii=False,
+            ).encode()
+            + b"\n"
+        )
+
+    @staticmethod
+    def deserialize(data: dict) -> "HistoryRecord":
+        return HistoryRecord(
+            data["i"],
+            data["t"],
+            data["a"],
+            data["s"],
+            data["b"],
+            tuple(tuple(action) for action in data["x"]),  # type: ignore
+            data["m"],
+        )
+
+
+def iter_lines_reversed(path: str) -> Iterator[tuple[int, bytes]]:
+    # reads the file backwards in chunks, newest lines come first (with their offsets)
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return
+
+    try:
+        position = os.fstat(fd).st_size
+        leftover = b""
+        while position > 0:
+            read_size = min(HISTORY_READ_CHUNK_SIZE, position)
+            position -= read_size
+            lines = (os.pread(fd, read_size, position) + leftover).split(b"\n")
+            # the first line might be cut in half, keep it for the next round
+            leftover = lines.pop(0)
+            offset = position + len(leftover) + 1
+            offsets = []
+            for line in lines:
+                offsets.append(offset)
+                offset += len(line) + 1
+            for line_offset, line in zip(reversed(offsets), reversed(lines)):
+                if line:
+                    yield line_offset, line
+        if leftover:
+            yield 0, leftover
+    finally:
+        os.close(fd)
+
+
+class NotificationHistory(Service):
+    """
+    Persistent notification history backed by an append-only log, records
+    are written (and images deduplicated) in a worker thread and read back
+    lazily newest first, so neither startup nor memory grows with the history
+    """
+
+    @Signal
+    def record_added(self, record: object, offset: int) -> None: ...
+
+    @Signal
+    def record_removed(self, record_id: int) -> None: ...
+
+    @Signal
+    def compacted(self) -> None: ...
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        for path in (HISTORY_PATH, HISTORY_IMAGES_PATH):
+            os.makedirs(path, exist_ok=True)
+
+        self._recent: deque[HistoryRecord] = deque(maxlen=HISTORY_MEMORY_RECORDS)
+        self._last_id = self.do_read_last_id()
+        self._dead_records = 0
+        # bumped whenever the log gets swapped, offsets from before are meaningless
+        self.generation = 0
+        # the log size that triggers the next compaction
+        self._compact_at = HISTORY_COMPACT_SIZE
+
+        self._jobs: queue.Queue[tuple] = queue.Queue()
+        self._log_file = open(HISTORY_LOG_PATH, "ab")
+        self._writer = GLib.Thread.new("fabrika-history", self.do_handle_jobs)
+
+        self._jobs.put(("compact", False))
+
+    @property
+    def recent(self) -> tuple[HistoryRecord, ...]:
+        return tuple(reversed(self._recent))
+
+    def do_read_last_id(self) -> int:
+        # ids only grow, so the newest record has the largest one, tombstones after it
+        # only ever point back at it or older records (never past it)
+        last_removed = 0
+        for _, line in iter_lines_reversed(HISTORY_LOG_PATH):
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            if "d" in data:
+                last_removed = max(last_removed, data["d"])
+                continue
+            return max(data["i"], last_removed)
+        return last_removed
+
+    def add_notification(
+        self, notification: Notification, image: GdkPixbuf.Pixbuf | None = None
+    ) -> int:
+        self._last_id += 1
+        record = HistoryRecord(
+            self._last_id,
+            GLib.get_real_time() / 1_000_000,
+            notification.app_name or "",
+            notification.summary or "",
+            notification.body or "",
+            tuple(
+                (action.identifier, action.label) for action in notification.actions
+            ),
+            None,
+        )
+        self._jobs.put(("append", record, image))
+        return record.id
+
+    def remove(self, record_id: int):
+        self._jobs.put(("remove", record_id))
+        return
+
+    def iter_records(self) -> Iterator[HistoryRecord]:
+        """Lazily yields all records, newest first"""
+        for _, record in self.iter_records_with_offsets():
+            yield record
+
+    def iter_records_with_offsets(self) -> Iterator[tuple[int, HistoryRecord]]:
+        removed: set[int] = set()
+        for offset, line in iter_lines_reversed(HISTORY_LOG_PATH):
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a torn write, skip it
+            if "d" in data:
+                removed.add(data["d"])
+                continue
+            if data["i"] in removed:
+                continue
+            yield offset, HistoryRecord.deserialize(data)
+
+    def read_record(self, offset: int) -> HistoryRecord | None:
+        """Reads back a single record given its offset in the log"""
+        try:
+            with open(HISTORY_LOG_PATH, "rb") as f:
+                f.seek(offset)
+                return HistoryRecord.deserialize(json.loads(f.readline()))
+        except (OSError, json.JSONDecodeError, KeyError):
+            return None
+
+    # worker side
+    def do_handle_jobs(self):
+        while True:
+            job, *args = self._jobs.get()
+            try:
+                match job:
+                    case "append":
+                        self.do_append(*args)
+                    case "remove":
+                        self.do_remove(*args)
+                    case "compact":
+                        self.do_compact(*args)
+            except Exception as e:
+                logger.error(f"[NotificationHistory] Failed to {job}: {e}")
+
+    def do_save_image(self, pixbuf: GdkPixbuf.Pixbuf) -> str | None:
+        success, data = pixbuf.save_to_bufferv("png", [], [])
+        if not success:
+            return None
+
+        # same image, same file
+        file_name = hashlib.sha256(data).hexdigest()[:32] + ".png"
+        if not os.path.isfile(image_path := HISTORY_IMAGES_PATH + "/" + file_name):
+            with open(image_path, "wb") as f:
+                f.write(data)
+        return file_name
+
+    def do_append(self, record: HistoryRecord, pixbuf: GdkPixbuf.Pixbuf | None):
+        if pixbuf is not None:
+            record = record._replace(image=self.do_save_image(pixbuf))
+
+        offset = self._log_file.tell()
+        self._log_file.write(record.serialize())
+        self._log_file.flush()
+        idle_add(self.do_post_append, record, offset)
+
+        if os.fstat(self._log_file.fileno()).st_size > self._compact_at:
+            self.do_compact(True)
+        return
+
+    def do_post_append(self, record: HistoryRecord, offset: int):
+        self._recent.append(record)
+        self.record_added(record, offset)
+        return False
+
+    def do_remove(self, record_id: int):
+        self._log_file.write(f'{{"d":{record_id}}}\n'.encode())
+        self._log_file.flush()
+        idle_add(self.do_post_remove, record_id)
+
+        self._dead_records += 1
+        if self._dead_records >= HISTORY_COMPACT_DEAD_RECORDS:
+            self.do_compact(True)
+        return
+
+    def do_post_remove(self, record_id: int):
+        for record in self._recent:
+            if record.id == record_id:
+                self._recent.remove(record)
+                break
+        self.record_removed(record_id)
+        return False
+
+    def do_compact(self, force: bool = False):
+        if not force and os.fstat(self._log_file.fileno()).st_size <= self._compact_at:
+            return
+
+        # iter_records already drops removed ones, keep the newest only
+        kept: list[HistoryRecord] = []
+        images: set[str] = set()
+        for record in self.iter_records():
+            if len(kept) >= HISTORY_MAX_RECORDS:
+                break
+            kept.append(record)
+            if record.image:
+                images.add(record.image)
+
+        temp_path = HISTORY_LOG_PATH + ".compact"
+        with open(temp_path, "wb") as f:
+            for record in reversed(kept):
+                f.write(record.serialize())
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._log_file.close()
+        os.replace(temp_path, HISTORY_LOG_PATH)
+        self.generation += 1
+        self._log_file = open(HISTORY_LOG_PATH, "ab")
+        self._dead_records = 0
+        # a full history might still be big, don't compact it again right away
+        self._compact_at = max(
+            HISTORY_COMPACT_SIZE, os.fstat(self._log_file.fileno()).st_size * 2
+        )
+
+        for file_name in os.listdir(HISTORY_IMAGES_PATH):
+            if file_name not in images:
+                os.remove(HISTORY_IMAGES_PATH + "/" + file_name)
+
+        logger.info(f"[NotificationHistory] Compacted history to {len(kept)} records")
+        idle_add(self.do_post_compact)
+        return
+
+    def do_post_compact(self):
+        # offsets changed, anyone holding them should refresh
+        self.compacted()
+        return False
+
+
+@cache
+def get_notification_history() -> NotificationHistory:
+    return NotificationHistory()
@@ -0,0 +1,255 @@
+import re
+import bisect
+from array import array
+from functools import cache
+from .common import (
+    fuzz,
+    Service,
+    Signal,
+    GLib,
+    logger,
+    idle_add,
+)
+from .notification_history import (
+    HistoryRecord,
+    NotificationHistory,
+    get_notification_history,
+)
+
+SEARCH_TOKEN_PATTERN = re.compile(r"\w+")
+SEARCH_TIME_FILTER_PATTERN = re.compile(r"^@(\d+)([mhdw])$")
+SEARCH_TIME_UNITS = {"m": 60, "h": 60 * 60, "d": 24 * 60 * 60, "w": 7 * 24 * 60 * 60}
+SEARCH_MAX_PREFIX_EXPANSION = 256  # vocabulary entries a single prefix can expand into
+SEARCH_FUZZY_MIN_RATIO = 75
+SEARCH_FUZZY_MIN_LENGTH = 4  # shorter tokens are only ever matched by prefix
+
+
+def tokenize(text: str) -> list[str]:
+    return SEARCH_TOKEN_PATTERN.findall(text.lower())
+
+
+def get_trigrams(token: str) -> set[str]:
+    padded = f" {token} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_query(text: str) -> tuple[list[str], float]:
+    """
+    Splits a query into search tokens and a "since" timestamp, e.g.
+    `2fa code @1d` searches for "2fa" and "code" in the last day
+    """
+    tokens: list[str] = []
+    since = 0.0
+    for word in text.split():
+        if match := SEARCH_TIME_FILTER_PATTERN.match(word):
+            amount, unit = match.groups()
+            since = (GLib.get_real_time() / 1_000_000) - (
+                int(amount) * SEARCH_TIME_UNITS[unit]
+            )
+            continue
+        tokens.extend(tokenize(word))
+    return tokens, since
+
+
+class InvertedIndex:
+    def __init__(self):
+        # documents are numbered in insertion order, which is also time order
+        self.doc_ids = array("q")
+        self.doc_times = array("d")
+        self.doc_offsets = array("q")
+        self.generation = 0  # of the history log the offsets point into
+        self.id_to_doc: dict[int, int] = {}
+        self.removed: set[int] = set()
+
+        self.postings: dict[str, array] = {}
+        self.vocabulary: list[str] = []  # kept sorted for prefix lookups
+        self.trigrams: dict[str, set[str]] = {}
+
+    @property
+    def last_id(self) -> int:
+        return self.doc_ids[-1] if self.doc_ids else 0
+
+    def add(self, record: HistoryRecord, offset: int):
+        doc = len(self.doc_ids)
+        self.doc_ids.append(record.id)
+        self.doc_times.append(record.timestamp)
+        self.doc_offsets.append(offset)
+        self.id_to_doc[record.id] = doc
+
+        for token in set(
+            tokenize(f"{record.app_name} {record.summary} {record.body}")
+        ):
+            if (postings := self.postings.get(token)) is None:
+                postings = self.postings[token] = array("I")
+                bisect.insort(self.vocabulary, token)
+                for trigram in get_trigrams(token):
+                    self.trigrams.setdefault(trigram, set()).add(token)
+            postings.append(doc)
+        return
+
+    def remove(self, record_id: int):
+        if (doc := self.id_to_doc.pop(record_id, None)) is not None:
+            self.removed.add(doc)
+        return
+
+    def expand_token(self, token: str) -> list[str]:
+        # exact and prefix matches
+        start = bisect.bisect_left(self.vocabulary, token)
+        matches = []
+        for i in range(start, len(self.vocabulary)):
+            if not self.vocabulary[i].startswith(token):
+                break
+            matches.append(self.vocabulary[i])
+            if len(matches) >= SEARCH_MAX_PREFIX_EXPANSION:
+                break
+        if matches or len(token) < SEARCH_FUZZY_MIN_LENGTH:
+            return matches
+
+        # nothing? try being fuzzy, candidates share at least a third of the trigrams
+        trigrams = get_trigrams(token)
+        counts: dict[str, int] = {}
+        for trigram in trigrams:
+            for candidate in self.trigrams.get(trigram, ()):
+                counts[candidate] = counts.get(candidate, 0) + 1
+        threshold = max(1, len(trigrams) // 3)
+        return [
+            candidate
+            for candidate, count in counts.items()
+            if count >= threshold
+            and fuzz.ratio(token, candidate) >= SEARCH_FUZZY_MIN_RATIO
+        ]
+
+    def search(self, tokens: list[str], since: float, limit: int | None) -> list[int]:
+        first_doc = bisect.bisect_left(self.doc_times, since) if since else 0
+
+        matched: set[int] | None = None
+        # rarest tokens first keeps the intersections small
+        for expanded in sorted(
+            (self.expand_token(token) for token in tokens),
+            key=lambda e: sum(len(self.postings[t]) for t in e),
+        ):
+            docs: set[int] = set()
+            for token in expanded:
+                postings = self.postings[token]
+                docs.update(postings[bisect.bisect_left(postings, first_doc) :])
+            matched = docs if matched is None else matched & docs
+            if not matched:
+                return []
+
+        if matched is None:
+            # no tokens, just the time filter
+            matched = set(range(first_doc, len(self.doc_ids)))
+
+        results: list[int] = []
+        for doc in sorted(matched - self.removed, reverse=True):
+            results.append(self.doc_ids[doc])
+            if limit is not None and len(results) >= limit:
+                break
+        return results
+
+
+class NotificationIndex(Service):
+    """
+    Keeps an `InvertedIndex` over the notification history's summary, body and app name
+    up-to-date as records get added, the initial build happens in a worker thread
+    """
+
+    @Signal
+    def ready(self) -> None: ...
+
+    def __init__(self, history: NotificationHistory, **kwargs):
+        super().__init__(**kwargs)
+        self._history = history
+        self._index = InvertedIndex()
+        self._ready = False
+        self._building = False
+        self._rebuild_queued = False
+        self._pending: list[tuple[HistoryRecord, int]] = []
+        self._pending_removed: set[int] = set()
+
+        history.connect("record-added", self.on_record_added)
+        history.connect("record-removed", self.on_record_removed)
+        history.connect("compacted", lambda *_: self.do_rebuild())
+
+        self.do_rebuild()
+
+    @property
+    def is_ready(self) -> bool:
+        return self._ready
+
+    def do_rebuild(self):
+        if self._building:
+            # one build at a time, the current one is outdated so go again after it
+            self._rebuild_queued = True
+            return
+        self._building = True
+        self._ready = False
+        self._pending.clear()
+        self._pending_removed.clear()
+        GLib.Thread.new("fabrika-notification-index", self.do_build)
+        return
+
+    def do_build(self):
+        index = InvertedIndex()
+        index.generation = self._history.generation
+        # scanning happens newest first, flip it
+        records = list(self._history.iter_records_with_offsets())
+        for offset, record in reversed(records):
+            index.add(record, offset)
+        idle_add(self.do_finish_build, index)
+        return
+
+    def do_finish_build(self, index: InvertedIndex):
+        # whatever arrived while we were building
+        for record, offset in self._pending:
+            if record.id > index.last_id:
+                index.add(record, offset)
+        for record_id in self._pending_removed:
+            index.remove(record_id)
+        self._pending.clear()
+        self._pending_removed.clear()
+
+        self._index = index
+        self._building = False
+        if self._rebuild_queued:
+            self._rebuild_queued = False
+            self.do_rebuild()
+            return False
+
+        self._ready = True
+        logger.info(f"[NotificationIndex] Indexed {len(index.doc_ids)} notifications")
+        self.ready()
+        return False
+
+    def on_record_added(self, _, record: HistoryRecord, offset: int):
+        if not self._ready:
+            self._pending.append((record, offset))
+            return
+        return self._index.add(record, offset)
+
+    def on_record_removed(self, _, record_id: int):
+        if not self._ready:
+            self._pending_removed.add(record_id)
+            return
+        return self._index.remove(record_id)
+
+    def search(self, text: str, limit: int | None = 20) -> list[int]:
+        """Returns matching record ids, newest first"""
+        return self._index.search(*parse_query(text), limit)
+
+    def get_record(self, record_id: int) -> HistoryRecord | None:
+        if (doc := self._index.id_to_doc.get(record_id)) is None:
+            return None
+        # the log got compacted under us, the offsets are stale until the rebuild is done
+        if self._index.generation != self._history.generation:
+            return None
+        record = self._history.read_record(self._index.doc_offsets[doc])
+        # ...and the swap might even land between the check and the read
+        if record is None or record.id != record_id:
+            return None
+        return record
+
+
+@cache
+def get_notification_index() -> NotificationIndex:
+    return NotificationIndex(get_notification_history())
@@ -1,3 +1,4 @@
+from collections.abc import Callable
 from .common import (
     Box,
     Label,
@@ -5,29 +6,43 @@ from .common import (
     FlowBox,
     Overlay,
     Revealer,
+    EventBox,
     Image,
     ClippingBox,
     Notification,
     Notifications,
     AnimatedScrollable,
-    Gtk,
     GdkPixbuf,
     bake_corner,
+    Gdk,
     cast,
     idle_add,
     invoke_repeater,
+    HeightCache,
     add_style_class_lazy,
     get_children_height_limit,
+    get_frame_monitor,
 )
+from .snippets.scheduler import DeadlineScheduler
+from .snippets.imaging import (
+    get_image_decoder,
+    get_icon_pixbuf,
+    decode_pixmap,
+    decode_file,
+)
+from .notification_history import get_notification_history
+from .notification_search import get_notification_index
 
 NOTIFICATION_WIDTH = 360
 NOTIFICATION_IMAGE_SIZE = 64
-NOTIFICATION_TIMEOUT = 10 * 1000  # 10 seconds
+NOTIFICATION_TIMEOUT = 10 * 1000  # 10 seconds, unless the notification says otherwise
 NOTIFICATION_BUTTONS_PER_ROW = 2
 NOTIFICATION_REVEALER_DURATION = 400  # ms
 NOTIFICATIONS_CORNERS_SIZE = 16
-
-DEFAULT_ICONS_THEME = Gtk.IconTheme.get_default()
+NOTIFICATIONS_INTAKE_DELAY = 100  # ms, notifications arriving within this get coalesced
+NOTIFICATIONS_BURST_SIZE = 3  # more threads than this from one app in a batch collapse
+NOTIFICATIONS_MAX_CARDS = 6  # cards that have widgets, the rest wait in line
+NOTIFICATIONS_MAX_ANIMATING = 2  # revealers sliding at once, others just pop in
 
 
 class LimitBox(Box):
@@ -47,7 +62,15 @@ class LimitBox(Box):
 
 
 class NotificationItem(Box):
-    def __init__(self, notification: Notification, **kwargs):
+    def __init__(
+        self,
+        notification: Notification,
+        count: int = 1,
+        on_close: Callable | None = None,
+        image: GdkPixbuf.Pixbuf | None = None,
+        image_pending: bool = False,
+        **kwargs,
+    ):
         super().__init__(
             name="notification",
             spacing=8,
@@ -57,155 +80,241 @@ class NotificationItem(Box):
         )
 
         self.notification = notification
+        self._on_close = on_close
 
         body_container = Box(spacing=4, orientation="h")
 
-        if image_pixbuf := self.notification.image_pixbuf:
-            body_container.add(
-                ClippingBox(
-                    children=(
-                        Image(
-                            pixbuf=image_pixbuf.scale_simple(
-                                NOTIFICATION_IMAGE_SIZE,
-                                NOTIFICATION_IMAGE_SIZE,
-                                GdkPixbuf.InterpType.BILINEAR,
-                            ),
-                            v_align="fill",
-                            h_align="fill",
-                            v_expand=True,
-                            h_expand=True,
-                        )
-                    ),
-                    v_align="start",
-                    h_align="start",
-                    v_expand=False,
-                    h_expand=False,
-                )
+        # a placeholder until the image gets decoded, hidden when there's none
+        self.image = Image(
+            icon_size=NOTIFICATION_IMAGE_SIZE // 2,
+            size=NOTIFICATION_IMAGE_SIZE,
+            v_align="fill",
+            h_align="fill",
+            v_expand=True,
+            h_expand=True,
+        )
+        self.image_clip = ClippingBox(
+            children=self.image,
+            cache_content=True,
+            v_align="start",
+            h_align="start",
+            v_expand=False,
+            h_expand=False,
+        )
+        self.image_clip.set_no_show_all(True)
+
+        self.summary_label = (
+            Label(style_classes="summary", ellipsization="middle")
+            .build()
+            .set_xalign(0.0)
+            .unwrap()
+        )
+        # notification's source icon
+        self.app_icon = Image(v_align="start", h_align="start")
+        # a collapsed burst, say how many are in there
+        self.count_label = Label(style_classes="count", v_align="center")
+        self.count_label.set_no_show_all(True)
+        self.body_label = (
+            Label(
+                style_classes="body",
+                line_wrap="word-char",
+                v_align="start",
+                h_align="start",
             )
-        print()
-        body_container.add(
+            .build()
+            .set_xalign(0.0)
+            .unwrap()
+        )
+
+        # a box for holding both the "summary" label and the "close" button
+        header = Box(
+            orientation="h",
+            children=[Overlay(child=self.summary_label, overlays=[self.app_icon])],
+            h_expand=True,
+            v_expand=True,
+            v_align="start",
+        )
+        header.pack_end(
+            Button(
+                image=Image(icon_name="close-symbolic", icon_size=18),
+                v_align="center",
+                h_align="end",
+                on_clicked=lambda *_: self._on_close()
+                if self._on_close
+                else self.notification.close(),
+                on_state_flags_changed=lambda btn, *_: (
+                    btn.set_cursor("pointer")
+                    if btn.get_state_flags() & 2
+                    else btn.set_cursor("default"),
+                ),
+            ),
+            False,
+            False,
+            0,
+        )
+        header.pack_end(self.count_label, False, False, 0)
+
+        body_container.children = (
+            self.image_clip,
             Box(
                 spacing=4,
                 orientation="v",
+                children=[header, self.body_label],
+                h_expand=True,
+                v_expand=True,
+            ),
+        )
+        self.add(body_container)
+
+        self.actions_box: FlowBox | None = None
+        self._actions_key: tuple | None = None
+
+        self.update(notification, count, image, image_pending)
+
+    def update(
+        self,
+        notification: Notification,
+        count: int = 1,
+        image: GdkPixbuf.Pixbuf | None = None,
+        image_pending: bool = False,
+    ):
+        """Shows another notification (or the same one, changed) in place"""
+        self.notification = notification
+
+        self.summary_label.set_label(notification.summary or "")
+        self.body_label.set_label(notification.body or "")
+        self.app_icon.set_from_pixbuf(
+            # render app's icon if found
+            get_icon_pixbuf(notification.app_icon or notification.app_name, 12)
+        )
+        self.count_label.set_label(str(count))
+        self.count_label.set_visible(count > 1)
+
+        if image is not None:
+            self.set_image(image)
+        elif image_pending:
+            self.image.set_from_icon_name(
+                "image-loading-symbolic", NOTIFICATION_IMAGE_SIZE // 2
+            )
+            self.image_clip.show_all()
+        else:
+            self.image_clip.hide()
+
+        self.do_update_actions()
+
+        if not get_frame_monitor().degraded:
+            self.remove_style_class("shine")
+            add_style_class_lazy(self, "shine")
+        return
+
+    def do_update_actions(self):
+        actions = self.notification.actions
+        # the buttons are bound to their notification, only a new one gets new buttons
+        key = (self.notification, tuple(action.identifier for action in actions))
+        if key == self._actions_key:
+            return
+        self._actions_key = key
+        if self.actions_box is not None:
+            self.actions_box.destroy()
+            self.actions_box = None
+        if not actions:
+            return
+
+        self.actions_box = (
+            FlowBox(
+                spacing=4,
+                row_spacing=4,
+                column_spacing=4,
+                orientation="h",
+                v_expand=True,
+                h_expand=True,
                 children=[
-                    # a box for holding both the "summary" label and the "close" button
-                    Box(
-                        orientation="h",
-                        children=[
-                            Overlay(
-                                child=Label(
-                                    label=self.notification.summary,
-                                    style_classes="summary",
-                                    ellipsization="middle",
-                                )
-                                .build()
-                                .set_xalign(0.0)
-                                .unwrap(),
-                                # notification's source icon
-                                overlays=[
-                                    Image(
-                                        # render app's icon if found
-                                        pixbuf=icn.load_icon()
-                                        if (
-                                            icn := DEFAULT_ICONS_THEME.lookup_icon(
-                                                self.notification.app_icon
-                                                or self.notification.app_name,
-                                                12,
-                                                Gtk.IconLookupFlags.FORCE_SIZE,
-                                            )
-                                        )
-                                        is not None
-                                        else None,
-                                        v_align="start",
-                                        h_align="start",
-                                    )
-                                ],
-                            ),
-                        ],
+                    Button(
                         h_expand=True,
                         v_expand=True,
-                        v_align="start",
-                    )
-                    # add the "close" button
-                    .build(
-                        lambda box, _: box.pack_end(
-                            Button(
-                                image=Image(
-                                    icon_name="close-symbolic",
-                                    icon_size=18,
-                                ),
-                                v_align="center",
-                                h_align="end",
-                                on_clicked=lambda *_: self.notification.close(),
-                                on_state_flags_changed=lambda btn, *_: (
-                                    btn.set_cursor("pointer")
-                                    if btn.get_state_flags() & 2
-                                    else btn.set_cursor("default"),
-                                ),
-                            ),
-                            False,
-                            False,
-                            0,
-                        )
-                    ),
-                    Label(
-                        label=self.notification.body,
-                        style_classes="body",
-                        line_wrap="word-char",
-                        v_align="start",
-                        h_align="start",
+                        label=action.label,
+                        on_clicked=lambda *_, action=action: action.invoke(),
+                        on_state_flags_changed=lambda btn, *_: (
+                            btn.set_cursor("pointer")
+                            if btn.get_state_flags() & 2
+                            else btn.set_cursor("default"),
+                        ),
                     )
-                    .build()
-                    .set_xalign(0.0)
-                    .unwrap(),
+                    for action in actions
                 ],
-                h_expand=True,
-                v_expand=True,
             )
+            .build()
+            .set_max_children_per_line(
+                min(len(actions), NOTIFICATION_BUTTONS_PER_ROW)
+            )
+            .unwrap()
         )
+        self.add(self.actions_box)
+        self.actions_box.show_all()
+        return
 
-        self.add(body_container)
+    def set_image(self, pixbuf: GdkPixbuf.Pixbuf | None):
+        if pixbuf is None:
+            # couldn't decode it, don't leave a spinner around
+            return self.image_clip.hide()
+        self.image.set_from_pixbuf(pixbuf)
+        self.image_clip.show_all()
+        return self.image_clip.invalidate_content()
 
-        if actions := self.notification.actions:
-            self.add(
-                FlowBox(
-                    spacing=4,
-                    row_spacing=4,
-                    column_spacing=4,
-                    orientation="h",
-                    v_expand=True,
-                    h_expand=True,
-                    children=[
-                        Button(
-                            h_expand=True,
-                            v_expand=True,
-                            label=action.label,
-                            on_clicked=lambda *_, action=action: action.invoke(),
-                            on_state_flags_changed=lambda btn, *_: (
-                                btn.set_cursor("pointer")
-                                if btn.get_state_flags() & 2
-                                else btn.set_cursor("default"),
-                            ),
-                        )
-                        for action in actions
-                    ],
-                )
-                .build()
-                .set_max_children_per_line(
-                    min(len(actions), NOTIFICATION_BUTTONS_PER_ROW)
-                )
-                .unwrap()
-            )
 
-        # automatically close the notification after the timeout period
-        invoke_repeater(
-            NOTIFICATION_TIMEOUT,
-            self.notification.close,
-            "expired",
-            initial_call=False,
+class NotificationGroup:
+    """Notifications from the same app and thread, shown as a single card"""
+
+    def __init__(self, key: tuple[str, str | None]):
+        self.key = key
+        self.notifications: list[Notification] = []
+        self.revealer: Revealer | None = None  # None while waiting in line
+
+    @property
+    def latest(self) -> Notification:
+        return self.notifications[-1]
+
+    def close(self):
+        for notification in tuple(self.notifications):
+            notification.close()
+        return
+
+
+def submit_notification_image(
+    notification: Notification, callback: Callable[[GdkPixbuf.Pixbuf | None], None]
+) -> bool:
+    """Decodes and downscales the notification's image in a worker, returns `False` if it has none"""
+    size = (NOTIFICATION_IMAGE_SIZE, NOTIFICATION_IMAGE_SIZE)
+    if pixmap := notification.image_pixmap:
+        get_image_decoder().submit(
+            decode_pixmap,
+            callback,
+            pixmap.byte_array,
+            pixmap.width,
+            pixmap.height,
+            pixmap.rowstride,
+            pixmap.has_alpha,
+            pixmap.bits_per_sample,
+            size,
+        )
+        return True
+    if image_file := notification.image_file:
+        get_image_decoder().submit(
+            decode_file, callback, image_file.removeprefix("file://"), size
         )
+        return True
+    return False
 
-        add_style_class_lazy(self, "shine")
+
+def get_notification_timeout(notification: Notification) -> int:
+    # -1 leaves it up to us, 0 means it should stay until closed
+    timeout = notification.timeout
+    return NOTIFICATION_TIMEOUT if timeout is None or timeout < 0 else timeout
+
+
+def get_notification_thread(notification: Notification) -> str:
+    # no standard thread hint, chat clients usually put the sender/room in the summary
+    return notification.summary or ""
 
 
 # TODO: add the whole thing to a revealer that reveals to the left
@@ -214,10 +323,15 @@ class NotificationsView(Box):
         super().__init__(orientation="v", visible=False, **kwargs)
 
         self.viewport = Box(spacing=4, orientation="v")
+        # measure the notifications, not their (animating) revealers
+        self.viewport_heights = HeightCache(
+            self.viewport, lambda rev: cast(Revealer, rev).get_child()
+        )
 
         self.scrolled_window = AnimatedScrollable(
             min_content_size=(420, 1),
             max_content_size=(420, 480),
+            animation_mode="clip",
             h_scrollbar_policy="never",
             v_scrollbar_policy="never",
             child=self.viewport,
@@ -234,35 +348,36 @@ class NotificationsView(Box):
             h_expand=True,
             v_expand=True,
         )
+        # the background follows the cards, not the size they're going to end up at
+        self.scrolled_window.clip_background(self.overall_container)
+
+        # expiry timers for every notification share one source, frozen while hovered
+        self._expiry = DeadlineScheduler()
+        self._expiry_handles: dict[Notification, int] = {}
+        self.hover_area = EventBox(
+            events=["enter-notify", "leave-notify"],
+            child=self.overall_container,
+        )
+        self.hover_area.connect("enter-notify-event", self.on_hover_change)
+        self.hover_area.connect("leave-notify-event", self.on_hover_change)
+
+        # record ids in the notification history, used for filtering
+        self._history_ids: dict[Notification, int] = {}
+        self._index = get_notification_index()
+        self._filter = ""
+
+        self._images: dict[Notification, GdkPixbuf.Pixbuf] = {}  # decoded and scaled
+        self._decoding: set[Notification] = set()
+        self._closed: set[Notification] = set()  # closed while still in the intake
+        self._intake: list[Notification] = []
+        self._intake_handler: int = 0
+        self._groups: dict[tuple[str, str | None], NotificationGroup] = {}
+        self._notification_groups: dict[Notification, NotificationGroup] = {}
+        self._waiting: list[NotificationGroup] = []  # oldest first
+        self._animating: set[Revealer] = set()
 
         self.notifications = Notifications(
-            on_notification_added=lambda _, notification_id: (
-                notification := cast(
-                    Notification, self.notifications.notifications.get(notification_id)
-                ),
-                self.viewport.add(
-                    item_rev := Revealer(
-                        child=NotificationItem(notification),
-                        reveal_child=False,
-                        transition_type="slide-down",
-                        transition_duration=NOTIFICATION_REVEALER_DURATION,
-                    )
-                ),
-                self.viewport.reorder_child(item_rev, 0),
-                # ready to show
-                item_rev.reveal(),
-                notification.closed.connect(
-                    lambda: (
-                        item_rev.connect(
-                            "notify::child-revealed",
-                            lambda: item_rev.destroy()
-                            if not item_rev.fully_revealed
-                            else None,
-                        ),
-                        idle_add(item_rev.unreveal),
-                    )
-                ),
-            ),
+            on_notification_added=self.on_notification_added
         )
 
         # i mean, it's just chef's kiss
@@ -293,7 +408,7 @@ class NotificationsView(Box):
                         h_expand=True,
                         v_expand=True,
                     ),
-                    self.overall_container,
+                    self.hover_area,
                 ],
             ),
             Box(
@@ -312,23 +427,271 @@ class NotificationsView(Box):
         self.viewport.connect("remove", self.on_children_change)
         self.connect("notify::visible", self.on_visiblity_change)
 
+    def on_notification_added(self, _, notification_id: int):
+        notification = cast(
+            Notification, self.notifications.notifications.get(notification_id)
+        )
+
+        # automatically close the notification after the timeout period
+        if timeout := get_notification_timeout(notification):
+            self._expiry_handles[notification] = self._expiry.schedule(
+                timeout, notification.close, "expired", pausable=True
+            )
+        notification.closed.connect(
+            lambda *_: self.on_notification_closed(notification)
+        )
+
+        # don't build anything yet, wait for the rest of the burst
+        self._intake.append(notification)
+        if not self._intake_handler:
+            self._intake_handler = invoke_repeater(
+                NOTIFICATIONS_INTAKE_DELAY, self.do_flush_intake, initial_call=False
+            )
+
+        self._decoding.add(notification)
+        if not submit_notification_image(
+            notification,
+            lambda pixbuf: self.on_notification_image_ready(notification, pixbuf),
+        ):
+            self.on_notification_image_ready(notification, None)
+        return
+
+    def on_notification_image_ready(
+        self, notification: Notification, pixbuf: GdkPixbuf.Pixbuf | None
+    ):
+        self._decoding.discard(notification)
+
+        # keep a copy around for the history, even if it's gone already
+        history_id = get_notification_history().add_notification(notification, pixbuf)
+
+        group = self._notification_groups.get(notification)
+        if not group and (
+            notification not in self._intake or notification in self._closed
+        ):
+            return
+
+        self._history_ids[notification] = history_id
+        if pixbuf is not None:
+            self._images[notification] = pixbuf
+
+        if not group or group.revealer is None or group.latest is not notification:
+            return
+
+        for item in cast(Box, group.revealer.get_child()).children:
+            cast(NotificationItem, item).set_image(pixbuf)
+        self.viewport_heights.do_invalidate_child(group.revealer)
+        return self.on_children_change()
+
+    def do_flush_intake(self) -> bool:
+        self._intake_handler = 0
+        intake, self._intake = self._intake, []
+
+        # bursty apps get collapsed into one card regardless of threads
+        threads: dict[str, set[str]] = {}
+        for notification in intake:
+            threads.setdefault(notification.app_name, set()).add(
+                get_notification_thread(notification)
+            )
+
+        touched: list[NotificationGroup] = []
+        for notification in intake:
+            if notification in self._closed:
+                self._closed.discard(notification)
+                continue  # closed before we even got to it
+            app_name = notification.app_name
+            key = (
+                app_name,
+                None
+                if len(threads[app_name]) > NOTIFICATIONS_BURST_SIZE
+                else get_notification_thread(notification),
+            )
+            if (group := self._groups.get(key)) is None:
+                group = self._groups[key] = NotificationGroup(key)
+            group.notifications.append(notification)
+            self._notification_groups[notification] = group
+            if group in touched:
+                touched.remove(group)
+            touched.append(group)
+
+        # oldest first, so the newest ends up on top
+        for group in touched:
+            self.do_present_group(group)
+        return False
+
+    def do_present_group(self, group: NotificationGroup):
+        if group in self._waiting:
+            self._waiting.remove(group)
+
+        if group.revealer is not None:
+            # already on screen, just refresh its content and bring it to the top
+            self.do_render_group(group)
+            self.viewport.reorder_child(group.revealer, 0)
+            # neither adds nor removes a child, but the card might've changed size
+            return self.on_children_change()
+
+        self.do_materialize_group(group, 0)
+
+        # too many cards, the oldest (bottom) one goes back in line
+        cards = {g.revealer: g for g in self._groups.values() if g.revealer is not None}
+        if len(cards) <= NOTIFICATIONS_MAX_CARDS:
+            return
+        for child in reversed(self.viewport.children):
+            if oldest := cards.get(child):  # type: ignore
+                return self.do_dematerialize_group(oldest)
+        return
+
+    def do_materialize_group(self, group: NotificationGroup, position: int):
+        group.revealer = Revealer(
+            child=Box(),
+            reveal_child=False,
+            transition_type="slide-down",
+            transition_duration=NOTIFICATION_REVEALER_DURATION
+            if len(self._animating) < NOTIFICATIONS_MAX_ANIMATING
+            else 0,
+        )
+        self.do_render_group(group)
+        self.viewport.add(group.revealer)
+        self.viewport.reorder_child(group.revealer, position)
+
+        revealer = group.revealer
+        if revealer.get_transition_duration():
+            self._animating.add(revealer)
+            revealer.connect(
+                "notify::child-revealed", lambda *_: self._animating.discard(revealer)
+            )
+        # ready to show
+        revealer.reveal()
+        return
+
+    def do_dematerialize_group(self, group: NotificationGroup):
+        if (revealer := group.revealer) is None:
+            return
+        group.revealer = None
+        revealer.destroy()
+        self._waiting.append(group)
+        return
+
+    def do_render_group(self, group: NotificationGroup):
+        if group.revealer is None or not group.notifications:
+            return
+        container = cast(Box, group.revealer.get_child())
+        image = self._images.get(group.latest)
+        image_pending = group.latest in self._decoding
+        # the card's already there? just update what's on it
+        if container.children:
+            cast(NotificationItem, container.children[0]).update(
+                group.latest, len(group.notifications), image, image_pending
+            )
+            # measured before the change, it won't get re-allocated until later
+            return self.viewport_heights.do_invalidate_child(group.revealer)
+        container.add(
+            NotificationItem(
+                group.latest,
+                count=len(group.notifications),
+                on_close=group.close,
+                image=image,
+                image_pending=image_pending,
+            )
+        )
+        return
+
+    def do_rerender_group(self, group: NotificationGroup):
+        self.do_render_group(group)
+        self.on_children_change()
+        return False
+
+    def on_notification_closed(self, notification: Notification):
+        if (handle := self._expiry_handles.pop(notification, None)) is not None:
+            self._expiry.cancel(handle)
+        self._history_ids.pop(notification, None)
+        self._images.pop(notification, None)
+        self._decoding.discard(notification)
+        if not (group := self._notification_groups.pop(notification, None)):
+            if notification in self._intake:
+                self._closed.add(notification)
+            return
+
+        was_latest = group.latest is notification
+        group.notifications.remove(notification)
+
+        if group.notifications:
+            if was_latest:
+                idle_add(self.do_rerender_group, group)
+            return
+
+        # last one out, take the card down
+        self._groups.pop(group.key, None)
+        if group in self._waiting:
+            self._waiting.remove(group)
+            return
+
+        if (revealer := group.revealer) is None:
+            return
+        group.revealer = None
+        revealer.connect(
+            "notify::child-revealed",
+            lambda: (
+                revealer.destroy(),
+                self.do_materialize_next(),
+            )
+            if not revealer.fully_revealed
+            else None,
+        )
+        idle_add(revealer.unreveal)
+        return
+
+    def do_materialize_next(self):
+        # there's room now, the newest in line gets a card at the bottom
+        if not self._waiting:
+            return
+        group = self._waiting.pop()
+        return self.do_materialize_group(group, -1)
+
+    def set_filter(self, query: str = ""):
+        """Only shows notifications matching `query`, new notifications always show up"""
+        self._filter = query.strip()
+        matches = (
+            set(self._index.search(self._filter, limit=None))
+            if self._filter
+            else None
+        )
+        for group in self._groups.values():
+            if group.revealer is None:
+                continue
+            group.revealer.set_visible(
+                matches is None
+                or any(
+                    self._history_ids.get(notification) in matches
+                    for notification in group.notifications
+                )
+            )
+        return self.on_children_change()
+
     def on_children_change(self, *_):
         self.scrolled_window.animate_size(
-            get_children_height_limit(
-                self.viewport,
-                4,
-                lambda rev: (
-                    cast(Revealer, rev).get_child().get_preferred_size().minimum_size  # type: ignore
-                ),
-            )
+            get_children_height_limit(self.viewport, 4, cache=self.viewport_heights)
         )
 
-        return self.hide() if not self.viewport.children else self.show()
+        # filtered out groups are still children, they just aren't showing
+        if not any(child.get_visible() for child in self.viewport.children):
+            return self.hide()
+        return self.show()
+
+    def on_hover_change(self, _, event: Gdk.EventCrossing):
+        # moving between our own children isn't leaving
+        if event.detail == Gdk.NotifyType.INFERIOR:
+            return
+        return (
+            self._expiry.pause()
+            if event.type == Gdk.EventType.ENTER_NOTIFY
+            else self._expiry.resume()
+        )
 
     def on_visiblity_change(self, *_):
         self.viewport.remove_style_class("popped")
 
         if not self.get_visible():
-            return
+            # no pointer is going to leave a hidden popup
+            return self._expiry.resume()
 
         return add_style_class_lazy(self.viewport, "popped")
@@ -1,45 +1,185 @@
-from fabric.audio import Audio
+import os
 from fabric.widgets.box import Box
+from fabric.widgets.label import Label
 from fabric.widgets.image import Image
 from fabric.widgets.scale import Scale, ScaleMark
 from fabric.widgets.wayland import WaylandWindow as Window
-from .common import partial
-from components.snippets.animator import Animator, cubic_bezier
-from fabric.utils import invoke_repeater, remove_handler
+from fabric.hyprland.widgets import get_hyprland_connection
+from .common import Service, Signal, Gdk, GLib, logger, monitor_file
+from components.snippets.animator import SpringAnimator
+from components.snippets.scheduler import get_deadline_scheduler
+from .audio_state import get_audio_state
+
+OSD_FOCUS_TIMEOUT = 1700  # ms, before the osd shrinks back
+OSD_HIDE_TIMEOUT = 1700  # ms, after shrinking, before it goes away
+BACKLIGHT_PATH = "/sys/class/backlight"
 
 
 class AnimatedScale(Scale):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        self.animator = (
-            Animator(
-                duration=0.8,
-                timing_function=partial(cubic_bezier, 0.34, 1.56, 0.64, 1.0),
-                min_value=self.min_value,
-                max_value=self.value,
-                tick_widget=self,
-                notify_value=lambda anim: self.set_value(anim.value),
-            )
-            .build()
-            .play()
-            .unwrap()
+        # a spring, so scrolling fast keeps up instead of restarting from scratch
+        self.animator = SpringAnimator(
+            response=0.4,
+            damping_ratio=0.7,  # a hint of overshoot, like the old curve
+            value=self.value,
+            max_value=self.value,
+            tick_widget=self,
+            notify_value=lambda anim, *_: self.set_value(anim.value),
         )
 
     def animate_value(self, value: float):
-        self.animator.pause()
-        self.animator.min_value = self.value
-        self.animator.max_value = value
-        self.animator.play()
+        return self.animator.animate_to(value)
+
+
+class OSDSource(Service):
+    """
+    Something the OSD can show, sources are event-driven and emit `activated`
+    whenever their state changes, a `value` of `None` shows `label` instead of the scale
+    """
+
+    @Signal
+    def activated(self) -> None: ...
+
+    icon_name: str = "dialog-information-symbolic"
+    value: float | None = None  # 0 to 100
+    label: str = ""
+    adjustable: bool = False
+
+    def set_value(self, value: float):
         return
 
 
-class AudioOSDContainer(Box):
-    def __init__(self, window: Window, **kwargs):
+class AudioOSDSource(OSDSource):
+    adjustable = True
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._audio = get_audio_state()
+        self._audio.connect("notify::speaker-volume", lambda *_: self.activated())
+
+    @property
+    def value(self) -> float:  # type: ignore
+        return self._audio.speaker_volume
+
+    @property
+    def icon_name(self) -> str:  # type: ignore
+        volume = self._audio.speaker_volume
+        return (
+            "audio-volume-high-symbolic"
+            if volume >= 80
+            else "audio-volume-low-symbolic"
+            if volume < 50
+            else "audio-volume-medium-symbolic"
+        )
+
+    def set_value(self, value: float):
+        self._audio.speaker_volume = value
+        return
+
+
+class BrightnessOSDSource(OSDSource):
+    icon_name = "display-brightness-symbolic"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._monitors = []
+        self._device: str | None = None
+        self.value = None
+
+        devices = os.listdir(BACKLIGHT_PATH) if os.path.isdir(BACKLIGHT_PATH) else []
+        for device in devices:
+            device_path = f"{BACKLIGHT_PATH}/{device}"
+            # the kernel notifies on these (inotify), no polling involved
+            for file_name in ("actual_brightness", "brightness"):
+                self._monitors.append(
+                    monitor_file(
+                        f"{device_path}/{file_name}",
+                        lambda *_, device=device_path: self.on_brightness_changed(device),
+                    )
+                )
+
+        if devices:
+            self.value = self.do_read(f"{BACKLIGHT_PATH}/{devices[0]}")
+
+    @staticmethod
+    def do_read(device_path: str) -> float | None:
+        try:
+            with open(f"{device_path}/actual_brightness") as f:
+                current = int(f.read())
+            with open(f"{device_path}/max_brightness") as f:
+                maximum = int(f.read())
+        except (OSError, ValueError):
+            return None
+        return current / maximum * 100 if maximum else None
+
+    def on_brightness_changed(self, device_path: str):
+        if (value := self.do_read(device_path)) is None or value == self.value:
+            return
+        self.value = value
+        return self.activated()
+
+
+class LayoutOSDSource(OSDSource):
+    icon_name = "input-keyboard-symbolic"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        try:
+            get_hyprland_connection().connect(
+                "event::activelayout", self.on_layout_changed
+            )
+        except Exception as e:
+            logger.warning(f"[OSD] Keyboard layout changes won't show up: {e}")
+
+    def on_layout_changed(self, _, event):
+        # keyboard name, then the layout (which might have commas in it)
+        layout = ",".join(event.data[1:])
+        if not layout or layout == self.label:
+            return
+        self.label = layout
+        return self.activated()
+
+
+class LockKeysOSDSource(OSDSource):
+    icon_name = "input-keyboard-symbolic"
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._keymap = Gdk.Keymap.get_for_display(Gdk.Display.get_default())
+        self._state = self.do_read()
+        self._keymap.connect("state-changed", self.on_state_changed)
+
+    def do_read(self) -> tuple[bool, bool]:
+        return self._keymap.get_caps_lock_state(), self._keymap.get_num_lock_state()
+
+    def on_state_changed(self, *_):
+        # fires for any modifier, only lock changes are interesting
+        state = self.do_read()
+        if state == self._state:
+            return
+        old_caps = self._state[0]
+        caps, num = self._state = state
+        self.label = (
+            f"Caps Lock {'on' if caps else 'off'}"
+            if caps != old_caps
+            else f"Num Lock {'on' if num else 'off'}"
+        )
+        return self.activated()
+
+
+class OSDContainer(Box):
+    def __init__(self, window: Window, sources: list[OSDSource], **kwargs):
         super().__init__(**kwargs, spacing=12, name="osd-container")
-        self.last_handler: int = 0
         self.window = window
-        self.audio = Audio(controller_name="fabric-osd")
+        self._source: OSDSource | None = None
+        self._pending: OSDSource | None = None
+        self._present_handler: int = 0
+        self._timeout_handle: int = 0
+
         self.icon = Image(icon_name="audio-volume-medium-symbolic", icon_size=26)
+        self.label = Label(style_classes="osd-label", visible=False)
+        self.label.set_no_show_all(True)
 
         self.scale = AnimatedScale(
             marks=(ScaleMark(value=i) for i in range(1, 100, 10)),
@@ -54,50 +194,75 @@ class AudioOSDContainer(Box):
                 if not (sc.get_state_flags() & 2)  # type: ignore
                 else None,
             ),
-            on_value_changed=lambda *_: self.audio.speaker
-            and (
-                self.is_hovered() and self.audio.speaker.set_volume(self.scale.value),
-                self.icon.set_from_icon_name(
-                    "audio-volume-high-symbolic"
-                    if self.audio.speaker.volume >= 80
-                    else "audio-volume-low-symbolic"
-                    if self.audio.speaker.volume < 50
-                    else "audio-volume-medium-symbolic",
-                    26,
-                ),
+            on_value_changed=lambda *_: (
+                self.is_hovered()
+                and self._source
+                and self._source.adjustable
+                and self._source.set_value(self.scale.value),
+                self._source and self.icon.set_from_icon_name(self._source.icon_name, 26),
             ),
         )
+        self.scale.set_no_show_all(True)
 
-        self.audio.connect(
-            "notify::speaker",
-            lambda *_: self.audio.speaker
-            and self.audio.speaker.build(
-                lambda speaker, builder: (
-                    speaker.connect(
-                        "notify::volume",
-                        lambda *_: not self.is_hovered()
-                        and (vol := round(self.audio.speaker.volume))
-                        and (self.update(), self.scale.animate_value(vol)),
-                    ),
-                    self.scale.animate_value(speaker.volume),
-                )
-            ),
-        )
+        for source in sources:
+            source.connect("activated", self.on_source_activated)
+
+        self.children = self.icon, self.scale, self.label
+
+        # start off showing the volume, as it always did
+        if sources:
+            self.do_switch_source(sources[0])
+
+    def on_source_activated(self, source: OSDSource):
+        if self.is_hovered() and source is self._source:
+            return  # the user is dragging it, it already knows
+        # several sources firing at once (or one firing a lot) show up once, the latest wins
+        self._pending = source
+        if not self._present_handler:
+            self._present_handler = GLib.idle_add(self.do_present)
+        return
+
+    def do_present(self) -> bool:
+        self._present_handler = 0
+        if (source := self._pending) is None:
+            return False
+        self._pending = None
 
-        self.children = self.icon, self.scale
+        if source is not self._source:
+            self.do_switch_source(source)
+        elif source.value is not None:
+            self.scale.animate_value(source.value)
+        else:
+            self.label.set_label(source.label)
+        self.icon.set_from_icon_name(source.icon_name, 26)
+        self.update()
+        return False
 
-    def remove_last_handler(self):
-        if self.last_handler:
-            remove_handler(self.last_handler)
-            self.last_handler = 0
+    def do_switch_source(self, source: OSDSource):
+        self._source = source
+        if source.value is None:
+            self.label.set_label(source.label)
+            self.scale.hide()
+            self.label.show()
+        else:
+            # jump straight there, animating from another source's value makes no sense
+            self.scale.animator.jump_to(source.value)
+            self.label.hide()
+            self.scale.show()
+        self.icon.set_from_icon_name(source.icon_name, 26)
+        return
+
+    def do_set_timeout(self, timeout: int, callback):
+        scheduler = get_deadline_scheduler()
+        if self._timeout_handle:
+            scheduler.cancel(self._timeout_handle)
+        self._timeout_handle = scheduler.schedule(timeout, callback)
         return
 
     def update(self, *_):
         self.window.show()
         self.focus()
-        self.remove_last_handler()
-        self.last_handler = invoke_repeater(1700, self.unfocus, initial_call=False)
-        return
+        return self.do_set_timeout(OSD_FOCUS_TIMEOUT, self.unfocus)
 
     def focus(self, *_):
         self.style_classes = "focused"
@@ -105,11 +270,11 @@ class AudioOSDContainer(Box):
 
     def unfocus(self, *_):
         self.style_classes = ()
-        self.remove_last_handler()
-        self.last_handler = invoke_repeater(1700, self.unpop, initial_call=False)
+        self.do_set_timeout(OSD_HIDE_TIMEOUT, self.unpop)
         return False
 
     def unpop(self, *_):
+        self._timeout_handle = 0
         if not self.is_hovered():
             self.window.hide()
         return False
@@ -119,4 +284,13 @@ class OSD(Box):
     def __init__(self, window: Window, **kwargs):
         super().__init__(orientation="h", name="osd", **kwargs)
 
-        self.children = AudioOSDContainer(orientation="h", window=window)
+        self.children = OSDContainer(
+            orientation="h",
+            window=window,
+            sources=[
+                AudioOSDSource(),
+                BrightnessOSDSource(),
+                LayoutOSDSource(),
+                LockKeysOSDSource(),
+            ],
+        )
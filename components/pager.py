@@ -15,6 +15,7 @@ from .common import (
     ClippingBox,
     logger,
     invoke_repeater,
+    get_motion_policy,
 )
 
 
@@ -50,6 +51,10 @@ class HyprlandClient(TypedDict):
     focusHistoryID: int
 
 
+# capture this many times slower while in reduced motion mode
+REDUCED_MOTION_SLOWDOWN = 4
+
+
 class TickChoker:
     def __init__(
         self, widget: Gtk.Widget, target_fps: int, callback: Callable, *callback_data
@@ -86,7 +91,11 @@ class TickChoker:
         if self.last_tick_time == 0.0:
             self.last_tick_time = now + self.offset_time
 
-        if now - self.last_tick_time >= self.period:
+        period = self.period
+        if get_motion_policy().reduced_motion:
+            period *= REDUCED_MOTION_SLOWDOWN
+
+        if now - self.last_tick_time >= period:
             self.last_tick_time = now
             self.callback(*self.callback_data)
 
@@ -0,0 +1,110 @@
+from typing import NamedTuple
+from .common import (
+    Service,
+    Signal,
+    Playerctl,
+    GLib,
+)
+
+
+class PlayerSnapshot(NamedTuple):
+    instance: str
+    title: str
+    artist: str
+    album: str
+    art_url: str
+    track_id: str | None
+    length: int  # µs, 0 if unknown
+    status: Playerctl.PlaybackStatus
+    loop_status: Playerctl.LoopStatus
+    can_seek: bool
+
+    @property
+    def is_playing(self) -> bool:
+        return self.status is Playerctl.PlaybackStatus.PLAYING
+
+    @property
+    def description(self) -> str:
+        return f"{self.title or 'Unknown'} - {self.artist or 'Unknown'}"
+
+
+class PlayerState(Service):
+    """
+    Reads a player's metadata and properties once per change into a `PlayerSnapshot`,
+    changes arriving within the same frame get coalesced into a single `changed`
+    """
+
+    @Signal
+    def changed(self, snapshot: object) -> None: ...
+
+    def __init__(self, player: Playerctl.Player, **kwargs):
+        super().__init__(**kwargs)
+        self._player = player
+        self._metadata: dict = {}
+        self._flush_handler: int = 0
+        self._handlers = [
+            player.connect("metadata", self.on_metadata),
+            player.connect("playback-status", self.on_property_change),
+            player.connect("loop-status", self.on_property_change),
+        ]
+        self._snapshot = self.do_read(player.props.metadata)  # type: ignore
+
+    @property
+    def player(self) -> Playerctl.Player:
+        return self._player
+
+    @property
+    def snapshot(self) -> PlayerSnapshot:
+        return self._snapshot
+
+    def on_metadata(self, _, metadata: GLib.Variant | None):
+        self._metadata = metadata.unpack() if metadata else {}  # type: ignore
+        return self.do_schedule_flush()
+
+    def on_property_change(self, *_):
+        return self.do_schedule_flush()
+
+    def do_schedule_flush(self):
+        if self._flush_handler:
+            return
+        # runs before gtk gets to layout and paint, so once per frame at most
+        self._flush_handler = GLib.idle_add(
+            self.do_flush, priority=GLib.PRIORITY_HIGH_IDLE
+        )
+        return
+
+    def do_flush(self) -> bool:
+        self._flush_handler = 0
+        snapshot = self.do_read()
+        if snapshot != self._snapshot:
+            self._snapshot = snapshot
+            self.changed(snapshot)
+        return False
+
+    def do_read(self, metadata: GLib.Variant | None = None) -> PlayerSnapshot:
+        if metadata is not None:
+            self._metadata = metadata.unpack()  # type: ignore
+        data = self._metadata
+        player = self._player
+        artist = data.get("xesam:artist") or ""
+        return PlayerSnapshot(
+            player.props.player_instance,  # type: ignore
+            data.get("xesam:title") or "",
+            ", ".join(artist) if isinstance(artist, list) else artist,
+            data.get("xesam:album") or "",
+            data.get("mpris:artUrl") or "",
+            data.get("mpris:trackid"),
+            int(data.get("mpris:length") or 0),
+            player.props.playback_status,  # type: ignore
+            player.props.loop_status,  # type: ignore
+            bool(player.props.can_seek),  # type: ignore
+        )
+
+    def close(self):
+        if self._flush_handler:
+            GLib.source_remove(self._flush_handler)
+            self._flush_handler = 0
+        for handler in self._handlers:
+            self._player.handler_disconnect(handler)
+        self._handlers.clear()
+        return
@@ -1,33 +1,43 @@
 from .common import (
     Gtk,
     Gdk,
+    GdkPixbuf,
+    GLib,
     Playerctl,
-    Fabricator,
     Signal,
     SwipeButton,
     Overlay,
     Label,
+    Image,
     Stack,
+    ClippingBox,
     Box,
     Builder,
     bake_progress_bar,
     bake_icon,
     idle_add,
+    invoke_repeater,
+    remove_handler,
     cast,
 )
+from .album_art import ALBUM_ART_VARIANTS, get_album_art_cache
+from .player_state import PlayerState, PlayerSnapshot
+
+PLAYER_PROGRESS_INTERVAL = 1000  # ms, only ticks while playing and on screen
+PLAYERS_MAX_MATERIALIZED = 3  # the visible player and the most recently active ones
 
 
 class Player(SwipeButton):
     @Signal
     def focus_request(self): ...
 
-    def __init__(self, player: Playerctl.Player, **kwargs):
+    def __init__(self, state: PlayerState, **kwargs):
         super().__init__(name="player", **kwargs)
-        self._player = player
+        self._state = state
+        self._snapshot: PlayerSnapshot | None = None
+        self._player = player = state.player
         self._player_handlers: list[int] = []
 
-        self._player.props.player_name
-
         self._title_label = Label(
             max_chars_width=20,
             ellipsization="end",
@@ -67,47 +77,47 @@ class Player(SwipeButton):
         )
 
         self._progress_bar = bake_progress_bar(value=0.0, child=self._playback_icon)
-        self.update_playback_status()
-
-        Fabricator(self.get_player_percentage, 1000).bind(
-            "value", "value", self._progress_bar
-        )
 
-        self._player.bind(  # type: ignore
-            "metadata",
-            "tooltip-text",
-            self,
-            transform_to=lambda _,
-            v: f"{self._player.get_title() or 'Unknown'} - {self._player.get_artist() or 'Unknown'}"
-            or "Nothing Playing",
+        self._art_url: str | None = ""
+        self._art_image = Image(size=ALBUM_ART_VARIANTS["bar"])
+        self._art_clip = ClippingBox(
+            style_classes="player-art",
+            children=self._art_image,
+            cache_content=True,
+            v_align="center",
+            visible=False,
         )
-
-        self._player.bind(  # type: ignore
-            "metadata",
-            "label",
-            self._title_label,
-            transform_to=lambda _, v: (self._player.get_title() or "Unknown"),
-        )
-
-        self._player.bind(  # type: ignore
-            "metadata",
-            "label",
-            self._artist_label,
-            transform_to=lambda _, v: (self._player.get_artist() or "Unknown"),
-        )
-
-        self._player.notify("metadata")  # type: ignore
+        # stays hidden until there's art to show
+        self._art_clip.set_no_show_all(True)
+
+        # position is extrapolated locally, the player only gets asked on changes
+        self._length: int = 0  # µs
+        self._position: int = 0  # µs, as of `_position_time`
+        self._position_time: int = 0  # monotonic µs
+        self._position_stale = True
+        self._rate = 1.0  # playerctl doesn't expose the playback rate
+        self._playing = False
+        self._progress_handler: int = 0
+
+        # everything else comes from the (shared) state snapshot
+        self._state_handler = state.connect("changed", self.on_state_changed)
         self._player_handlers.extend(
             (
+                self._player.connect("exit", lambda *_: self.close()),
                 self._player.connect(
-                    "metadata",
-                    lambda *_: self._player.notify("metadata"),  # type: ignore
+                    "seeked", lambda _, position: self.do_resync_position(position)
                 ),
-                self._player.connect("exit", lambda *_: self.close()),
-                self._player.connect("playback-status", self.update_playback_status),
             )
         )
+        self.connect(
+            "map",
+            lambda *_: self.do_resync_position()
+            if self._position_stale
+            else (self.do_update_progress(), self.do_schedule_progress()),
+        )
+        self.connect("unmap", lambda *_: self.do_schedule_progress())
 
+        self._loop_label = Label("???")
         self._controls_menu = Gtk.Menu()
         self._controls_menu.append(
             Builder(
@@ -118,22 +128,7 @@ class Player(SwipeButton):
                             bake_icon(
                                 icon_name="media-playlist-repeat-symbolic", icon_size=24
                             ),
-                            Label("???").build(
-                                lambda lbl, _: (
-                                    (
-                                        update := lambda *_: lbl.set_label(
-                                            "Track"
-                                            if (loopstat := player.props.loop_status)
-                                            is Playerctl.LoopStatus.TRACK
-                                            else "Playlist"
-                                            if loopstat is Playerctl.LoopStatus.PLAYLIST
-                                            else "None"
-                                        )
-                                    ),
-                                    update(),
-                                    player.connect("loop-status", update),
-                                )
-                            ),
+                            self._loop_label,
                         ),
                     )
                 )
@@ -142,7 +137,7 @@ class Player(SwipeButton):
                 "button-press-event",
                 lambda *_: player.set_loop_status(
                     Playerctl.LoopStatus.NONE
-                    if (loopstat := player.props.loop_status)
+                    if (loopstat := self._state.snapshot.loop_status)
                     is Playerctl.LoopStatus.TRACK
                     else Playerctl.LoopStatus.PLAYLIST
                     if loopstat is Playerctl.LoopStatus.NONE
@@ -157,6 +152,7 @@ class Player(SwipeButton):
             orientation="h",
             children=[
                 self._progress_bar,
+                self._art_clip,
                 Overlay(
                     child=self._metadata_box,
                     overlays=[
@@ -179,11 +175,9 @@ class Player(SwipeButton):
             ],
         )
 
+        self.on_state_changed(state, state.snapshot)
         idle_add(
-            lambda: self.focus_request()
-            if self._player.get_property("playback-status")
-            is Playerctl.PlaybackStatus.PLAYING
-            else None
+            lambda: self.focus_request() if self._state.snapshot.is_playing else None
         )
 
         # i'm a button. after all
@@ -240,8 +234,43 @@ class Player(SwipeButton):
 
         return self._player.play_pause()
 
-    def update_playback_status(self, *_):
-        status = cast(Playerctl.PlaybackStatus, self._player.props.playback_status)  # type: ignore
+    def on_state_changed(self, _, snapshot: PlayerSnapshot):
+        previous, self._snapshot = self._snapshot, snapshot
+
+        if previous is None or snapshot.title != previous.title:
+            self._title_label.set_label(snapshot.title or "Unknown")
+        if previous is None or snapshot.artist != previous.artist:
+            self._artist_label.set_label(snapshot.artist or "Unknown")
+        self.set_tooltip_text(snapshot.description)
+
+        if previous is None or snapshot.loop_status != previous.loop_status:
+            self._loop_label.set_label(
+                "Track"
+                if snapshot.loop_status is Playerctl.LoopStatus.TRACK
+                else "Playlist"
+                if snapshot.loop_status is Playerctl.LoopStatus.PLAYLIST
+                else "None"
+            )
+
+        if previous is None or (snapshot.track_id, snapshot.art_url) != (
+            previous.track_id,
+            previous.art_url,
+        ):
+            self.update_art(snapshot.art_url)
+            get_album_art_cache().prefetch_next(snapshot.instance, snapshot.track_id)
+
+        if previous is None or snapshot.status != previous.status:
+            return self.update_playback_status(snapshot.status)
+        if (snapshot.track_id, snapshot.length, snapshot.can_seek) != (
+            previous.track_id,
+            previous.length,
+            previous.can_seek,
+        ):
+            self._length = snapshot.length
+            return self.do_resync_position()
+        return
+
+    def update_playback_status(self, status: Playerctl.PlaybackStatus):
         match status:
             case Playerctl.PlaybackStatus.PLAYING:
                 status_icon = "pause"
@@ -251,39 +280,117 @@ class Player(SwipeButton):
             case _:
                 status_icon = "stop"
 
-        return self._playback_icon.set_from_icon_name(
+        self._playback_icon.set_from_icon_name(
             f"media-playback-{status_icon}-symbolic", 16
         )
 
-    def get_player_length(self) -> int:
-        return cast(
-            int,
-            self._player.get_property("metadata").unpack().get("mpris:length"),  # type: ignore
+        # freeze the position where it was before switching modes
+        self._position = self.get_position()
+        self._position_time = GLib.get_monotonic_time()
+        self._playing = status is Playerctl.PlaybackStatus.PLAYING
+        self._length = self._state.snapshot.length
+        return self.do_resync_position()
+
+    def update_art(self, url: str):
+        if url == self._art_url or self._art_url is None:
+            return
+        self._art_url = url
+        return get_album_art_cache().request(
+            url, "bar", lambda pixbuf: self.on_art_ready(url, pixbuf)
+        )
+
+    def on_art_ready(self, url: str, pixbuf: GdkPixbuf.Pixbuf | None):
+        if url != self._art_url:
+            return  # the track changed (or we're gone) in the meantime
+        if pixbuf is None:
+            return self._art_clip.hide()
+        self._art_image.set_from_pixbuf(pixbuf)
+        self._art_clip.invalidate_content()
+        return self._art_clip.show()
+
+    def get_position(self) -> int:
+        if not self._playing:
+            return self._position
+        return self._position + round(
+            (GLib.get_monotonic_time() - self._position_time) * self._rate
         )
 
-    def get_player_percentage(self, f) -> float:
-        if not self._player.props.can_seek:  # type: ignore
-            return 0.0
-        try:
-            return self._player.get_position() / self.get_player_length()
-        except Exception:
-            return 0.0
+    def do_resync_position(self, position: int | None = None):
+        if position is None and not self.get_mapped():
+            # nobody's looking, ask the player once we're shown again
+            self._position_stale = True
+            return self.do_schedule_progress()
+
+        if position is None:
+            try:
+                position = cast(int, self._player.get_position())
+            except Exception:
+                position = 0
+
+        self._position = position
+        self._position_time = GLib.get_monotonic_time()
+        self._position_stale = False
+        self.do_update_progress()
+        return self.do_schedule_progress()
+
+    def do_schedule_progress(self):
+        if self._playing and self._length and self.get_mapped():
+            if not self._progress_handler:
+                self._progress_handler = invoke_repeater(
+                    PLAYER_PROGRESS_INTERVAL, self.do_update_progress, initial_call=False
+                )
+            return
+        if self._progress_handler:
+            remove_handler(self._progress_handler)
+            self._progress_handler = 0
+        return
+
+    def do_update_progress(self) -> bool:
+        if not self._length or not self._state.snapshot.can_seek:
+            self._progress_bar.value = 0.0
+            return True
+        self._progress_bar.value = min(1.0, max(0.0, self.get_position() / self._length))
+        return True
 
     def close(self):
         # cleanup and destroy
+        self._art_url = None
+        if self._state_handler:
+            self._state.disconnect(self._state_handler)
+            self._state_handler = 0
+        if self._progress_handler:
+            remove_handler(self._progress_handler)
+            self._progress_handler = 0
         for id in self._player_handlers:
             self._player.handler_disconnect(id)  # type: ignore
+        self._player_handlers.clear()
         return self.destroy()
 
 
+class PlayerModel:
+    """A player we know about, without any widgets built for it"""
+
+    def __init__(self, player: Playerctl.Player):
+        self.state = PlayerState(player)
+        self.instance: str = self.state.snapshot.instance
+        self.widget: Player | None = None
+        self.status_handler: int = 0  # only while there's no widget
+        self.was_playing = self.is_playing
+
+    @property
+    def is_playing(self) -> bool:
+        return self.state.snapshot.is_playing
+
+
 class Players(Stack):
     def __init__(self, **kwargs):
         super().__init__(transition_type="slide-up-down", **kwargs)
         self.add_events("scroll")  # type: ignore
-        self._visible_child_index = 0
 
         self._player_manager = Playerctl.PlayerManager.new()
-        self._players: list[Player] = []
+        self._models: list[PlayerModel] = []  # in order of appearance, for scrolling
+        self._recent: list[PlayerModel] = []  # most recently active first
+        self._visible_model: PlayerModel | None = None
 
         self._player_manager.connect("name-appeared", self.on_player_appeared)
         self._player_manager.connect("player-vanished", self.handle_player_vanished)
@@ -296,45 +403,104 @@ class Players(Stack):
             self.on_player_appeared(None, player_name)
         return
 
+    def get_model(self, instance: str) -> PlayerModel | None:
+        for model in self._models:
+            if model.instance == instance:
+                return model
+        return None
+
     def on_player_appeared(self, _, player_name: Playerctl.PlayerName):
-        player_widget = Player(Playerctl.Player.new_from_name(player_name))
+        model = PlayerModel(Playerctl.Player.new_from_name(player_name))
+        self._models.append(model)
+        self._recent.append(model)
+        self.do_watch_model(model)
 
-        self._players.append(player_widget)
-        self.add_named(player_widget, player_name.name)  # type: ignore
+        if self._visible_model is None or model.is_playing:
+            self.show_model(model)
+        return
+
+    def handle_player_vanished(self, _, player: Playerctl.Player):
+        if not (model := self.get_model(player.props.player_instance)):  # type: ignore
+            return
+
+        self._models.remove(model)
+        self._recent.remove(model)
+        self.do_unwatch_model(model)
+        get_album_art_cache().forget_player(model.instance)
+        self.do_dematerialize(model)
+        model.state.close()
+
+        if self._visible_model is model:
+            self._visible_model = None
+            if self._recent:
+                self.show_model(self._recent[0])
+        return
 
-        player_widget.focus_request.connect(
-            lambda *_: (
-                self._players.remove(player_widget),
-                self._players.insert(0, player_widget),
-                self.set_visible_child(player_widget),
+    def do_watch_model(self, model: PlayerModel):
+        # the cheapest way of knowing it became active, the widget takes over once built
+        if not model.status_handler:
+            model.was_playing = model.is_playing
+            model.status_handler = model.state.connect(
+                "changed", lambda *_: self.on_model_changed(model)
             )
-        )
+        return
 
-        if self._players:
-            self.set_visible_child(self._players[0])
+    def do_unwatch_model(self, model: PlayerModel):
+        if model.status_handler:
+            model.state.disconnect(model.status_handler)
+            model.status_handler = 0
+        return
 
+    def on_model_changed(self, model: PlayerModel):
+        # only a fresh start of playback counts as activity
+        was_playing, model.was_playing = model.was_playing, model.is_playing
+        if model.is_playing and not was_playing:
+            return self.show_model(model)
         return
 
-    def handle_player_vanished(self, _, player: Playerctl.Player):
-        player_widget = cast(
-            Player | None,
-            self.get_child_by_name(player.props.player_name),  # type: ignore
-        )
-        if not player_widget:
+    def do_materialize(self, model: PlayerModel) -> Player:
+        if model.widget is not None:
+            return model.widget
+
+        self.do_unwatch_model(model)
+        model.widget = Player(model.state)
+        model.widget.focus_request.connect(lambda *_: self.show_model(model))
+        self.add_named(model.widget, model.instance)
+        return model.widget
+
+    def do_dematerialize(self, model: PlayerModel):
+        if (widget := model.widget) is None:
+            return
+        model.widget = None
+        # might be gone already if the player exited on its own
+        if widget.get_parent() is self:
+            self.remove(widget)
+        return widget.close()
+
+    def show_model(self, model: PlayerModel):
+        if model not in self._models:
             return
 
-        self._players.remove(player_widget)
-        self.remove(player_widget)
+        self._recent.remove(model)
+        self._recent.insert(0, model)
+        self._visible_model = model
+        self.set_visible_child(self.do_materialize(model))
 
-        return player_widget.close()
+        # keep the visible one and the most recent few, everyone else goes back to being a model
+        for evicted in self._recent[PLAYERS_MAX_MATERIALIZED:]:
+            if evicted.widget is not None and evicted is not model:
+                self.do_dematerialize(evicted)
+                self.do_watch_model(evicted)
+        return
 
     def on_scroll_handler(self, _, event):
-        if not self.children:
+        if not self._models:
             return
 
-        # next child in the list or the first child if it's the last already (cycle)
-        self._visible_child_index = (
-            self._visible_child_index + (-1 if event.direction == 0 else 1)
-        ) % len(self.children)
-
-        return self.set_visible_child(self.children[self._visible_child_index])
+        index = (
+            self._models.index(self._visible_model) if self._visible_model else 0
+        )
+        # next player in the list or the first one if it's the last already (cycle)
+        return self.show_model(
+            self._models[(index + (-1 if event.direction == 0 else 1)) % len(self._models)]
+        )
@@ -0,0 +1,101 @@
+import os
+from typing import Literal
+from .common import (
+    Service,
+    Property,
+    logger,
+    invoke_repeater,
+    get_motion_policy,
+)
+
+POWER_SUPPLY_PATH = "/sys/class/power_supply"
+POWER_SAVER_CHECK_INTERVAL = 10 * 1000  # 10 seconds
+POWER_SAVER_LOAD_THRESHOLD = 0.9  # 1-minute load average per cpu
+POWER_SAVER_LOAD_CHECKS = 3  # consecutive checks before it counts as "sustained"
+
+PowerSaverMode = Literal["auto", "on", "off"]
+
+
+def read_sysfs_value(path: str) -> str:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return ""
+
+
+def is_on_battery() -> bool:
+    if not os.path.isdir(POWER_SUPPLY_PATH):
+        return False
+
+    has_battery = False
+    for supply in os.listdir(POWER_SUPPLY_PATH):
+        supply_path = os.path.join(POWER_SUPPLY_PATH, supply)
+        match read_sysfs_value(os.path.join(supply_path, "type")):
+            case "Mains" | "USB":
+                if read_sysfs_value(os.path.join(supply_path, "online")) == "1":
+                    return False
+            case "Battery":
+                has_battery = True
+
+    # desktops don't have batteries, thus always on AC
+    return has_battery
+
+
+class PowerSaver(Service):
+    """
+    Drives the global `MotionPolicy`, either manually or automatically
+    when running on battery or under sustained cpu load
+    """
+
+    @Property(str, "read-write", default_value="auto")
+    def mode(self) -> PowerSaverMode:
+        return self._mode
+
+    @mode.setter
+    def mode(self, value: PowerSaverMode):
+        if value not in ("auto", "on", "off"):
+            raise ValueError(f"unknown power saver mode {value}")
+        self._mode = value
+        self.do_apply()
+        return
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._mode: PowerSaverMode = "auto"
+        self._loaded_checks = 0
+        self._auto_reduced = False
+
+        invoke_repeater(POWER_SAVER_CHECK_INTERVAL, self.do_check, initial_call=True)
+
+    def toggle(self):
+        self.mode = "off" if get_motion_policy().reduced_motion else "on"
+        return
+
+    def do_check(self) -> bool:
+        load_per_cpu = os.getloadavg()[0] / (os.cpu_count() or 1)
+        self._loaded_checks = (
+            self._loaded_checks + 1
+            if load_per_cpu >= POWER_SAVER_LOAD_THRESHOLD
+            else 0
+        )
+
+        self._auto_reduced = (
+            self._loaded_checks >= POWER_SAVER_LOAD_CHECKS or is_on_battery()
+        )
+        self.do_apply()
+        return True
+
+    def do_apply(self):
+        policy = get_motion_policy()
+        reduced = (
+            self._auto_reduced if self._mode == "auto" else self._mode == "on"
+        )
+        if policy.reduced_motion == reduced:
+            return
+
+        logger.info(
+            f"[PowerSaver] {'Entering' if reduced else 'Leaving'} reduced motion mode ({self._mode})"
+        )
+        policy.reduced_motion = reduced
+        return
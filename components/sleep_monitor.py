@@ -0,0 +1,49 @@
+from functools import cache
+from .common import (
+    Service,
+    Signal,
+    Gio,
+    GLib,
+    logger,
+)
+
+
+class SleepMonitor(Service):
+    """
+    Tells when the system comes back from suspend (via logind), anything driven by
+    GLib timeouts should look at the clock again then, they don't count the time asleep
+    """
+
+    @Signal
+    def resumed(self) -> None: ...
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        Gio.bus_get(Gio.BusType.SYSTEM, None, self.on_system_bus_ready)
+
+    def on_system_bus_ready(self, _, result: Gio.AsyncResult):
+        try:
+            connection = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            return logger.warning(f"[SleepMonitor] Won't notice resuming: {e}")
+        connection.signal_subscribe(
+            "org.freedesktop.login1",
+            "org.freedesktop.login1.Manager",
+            "PrepareForSleep",
+            "/org/freedesktop/login1",
+            None,
+            Gio.DBusSignalFlags.NONE,
+            self.on_prepare_for_sleep,
+        )
+        return
+
+    def on_prepare_for_sleep(self, *args):
+        (sleeping,) = args[5].unpack()
+        if sleeping:
+            return
+        return self.resumed()
+
+
+@cache
+def get_sleep_monitor() -> SleepMonitor:
+    return SleepMonitor()
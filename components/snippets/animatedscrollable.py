@@ -1,11 +1,16 @@
 # Author: Yousef EL-Darsh
 # License (SPDX): CC-BY-NC-ND-4.0
 
+import math
+import cairo
+from typing import Literal
 from functools import partial
 from fabric.widgets.scrolledwindow import ScrolledWindow
 
 from .animator import Animator, cubic_bezier
 
+from gi.repository import Gtk
+
 
 class AnimatedScrollable(ScrolledWindow):
     # would you like to have a good looking scrollable?
@@ -13,26 +18,43 @@ class AnimatedScrollable(ScrolledWindow):
     # B. leave it and make it efficent
 
     # i take it
+
+    # ...or take the "clip" animation mode, it allocates the final size once
+    # and only animates the visible region, no relayouts at frame rate.
+    # styled ancestors get the final size too, pass them to `clip_background`
+    # or their background jumps ahead of the content
     def __init__(
         self,
         bezier_curve: tuple[float, float, float, float] = (0.2, 1, 0.8, 1.0),
         duration: float = 0.3,
+        animation_mode: Literal["layout", "clip"] = "layout",
         **kwargs,
     ):
         super().__init__(**kwargs)
         self._last_req = -1
+        self._animation_mode = animation_mode
         _, min_height = self.min_content_size
         _, max_height = self.max_content_size
 
+        # clip mode only, the height we're allocated with and the visible part of it
+        self._layout_height = max(min_height, 0)
+        self._clip_height = float(self._layout_height)
+        self._background_widget: Gtk.Widget | None = None
+
         self.height_animator = Animator(
             duration=duration,
             timing_function=partial(cubic_bezier, *bezier_curve),
             min_value=min_height,
             max_value=max_height,
             notify_value=self.on_animator_change,
+            on_finished=self.on_animator_finished,
         )
 
     def on_animator_change(self, animator: Animator, *_):
+        if self._animation_mode == "clip":
+            self._clip_height = max(animator.value, 0)
+            return (self._background_widget or self).queue_draw()
+
         value = round(animator.value)
         if value < 1:
             self.hide()
@@ -40,6 +62,24 @@ class AnimatedScrollable(ScrolledWindow):
             self.show()
         self.set_min_content_height(value)
 
+    def on_animator_finished(self, *_):
+        if self._animation_mode != "clip":
+            return
+
+        # shrinking, now that it's out of sight we can give the space back
+        target = round(self.height_animator.max_value)
+        if target < self._layout_height:
+            self.do_set_layout_height(target)
+        return
+
+    def do_set_layout_height(self, height: int):
+        self._layout_height = height
+        if height < 1:
+            return self.hide()
+        if not self.is_visible():
+            self.show()
+        return self.set_min_content_height(height)
+
     def do_animate(
         self,
         from_height: int = 0,
@@ -48,6 +88,11 @@ class AnimatedScrollable(ScrolledWindow):
         if to_height == -1:
             return
         self.height_animator.pause()
+
+        if self._animation_mode == "clip" and to_height > self._layout_height:
+            # growing, allocate the final size right away
+            self.do_set_layout_height(to_height)
+
         self.height_animator.min_value = from_height
         self.height_animator.max_value = to_height
         self.height_animator.play()
@@ -55,9 +100,67 @@ class AnimatedScrollable(ScrolledWindow):
 
     def animate_size(self, height: int = -1):
         self._last_req = height
+        if self._animation_mode == "clip":
+            return self.do_animate(round(self._clip_height), height)
         return self.do_animate(self.min_content_size[1], height)
 
+    def clip_background(self, widget: Gtk.Widget):
+        """
+        Clips a styled ancestor (clip mode only) to the part of it that'd be showing
+        if it were laid out at the animated height, so its background (and rounded
+        bottom corners) follow the content instead of jumping to the final size
+        """
+        self._background_widget = widget
+        widget.connect("draw", self.on_background_draw)
+        return
+
+    def on_background_draw(self, widget: Gtk.Widget, cr: cairo.Context):
+        hidden = self._layout_height - self._clip_height
+        if self._animation_mode != "clip" or hidden < 1:
+            return False
+
+        # runs before the widget draws itself, the clip holds for its children too
+        context = widget.get_style_context()
+        state = widget.get_state_flags()
+        margin = context.get_margin(state)  # type: ignore
+        left = margin.left
+        right = widget.get_allocated_width() - margin.right
+        bottom = widget.get_allocated_height() - margin.bottom - hidden
+        max_radius = max(min((right - left) / 2, bottom - margin.top), 0)
+        radius_left = min(
+            context.get_property("border-bottom-left-radius", state), max_radius
+        )
+        radius_right = min(
+            context.get_property("border-bottom-right-radius", state), max_radius
+        )
+
+        cr.move_to(left, 0)
+        cr.line_to(right, 0)
+        cr.arc(
+            right - radius_right, bottom - radius_right, radius_right, 0, math.pi / 2
+        )
+        cr.arc(
+            left + radius_left, bottom - radius_left, radius_left, math.pi / 2, math.pi
+        )
+        cr.close_path()
+        cr.clip()
+        return False
+
+    def do_draw(self, cr: cairo.Context):
+        if self._animation_mode != "clip":
+            return ScrolledWindow.do_draw(self, cr)
+
+        cr.save()
+        cr.rectangle(0, 0, self.get_allocated_width(), self._clip_height)
+        cr.clip()
+        ScrolledWindow.do_draw(self, cr)
+        cr.restore()
+        return True
+
     def do_get_preferred_height(self):
+        if self._animation_mode == "clip":
+            return self._layout_height, self._layout_height
+
         value = self.height_animator.value
         value = 0 if value < 0 else value
         return value, value
@@ -1,12 +1,15 @@
 # Author: Yousef EL-Darsh
 # License (SPDX): AGPL-3.0-or-later
 
+import math
 from functools import cache
 from typing import Protocol, cast
 from fabric.core.service import Service, Property, Signal
 from fabric.utils import clamp
 
-from gi.repository import GLib, Gtk
+from .motion import get_frame_monitor, get_motion_policy, get_window_name_for_widget
+
+from gi.repository import GLib, Gdk, Gtk
 
 
 @cache
@@ -162,6 +165,7 @@ class Animator(Service):
         repeat: bool = False,
         tick_widget: Gtk.Widget | None = None,
         tick_interval: int = 16,
+        essential: bool = False,
         **kwargs,
     ):
         super().__init__(**kwargs)
@@ -174,6 +178,9 @@ class Animator(Service):
         self._timing_function = timing_function
         self._tick_widget = tick_widget
         self._tick_interval = tick_interval
+        # essential animators carry information over time (e.g. timers)
+        # and must keep running in reduced motion mode
+        self._essential = essential
 
         self.timing_function = timing_function
         self.repeat = repeat
@@ -187,9 +194,46 @@ class Animator(Service):
         self._tick_handler = None
         self._timeline_pos = 0.0
 
+        # frame accounting, see `FrameMonitor`
+        self.frames = 0
+        self.dropped_frames = 0
+        self._last_tick_time = None
+        self._window_name = None
+        self._degraded = False
+        self._skip_tick = False
+
+    def get_window_name(self) -> str:
+        if self._window_name is None:
+            self._window_name = get_window_name_for_widget(self._tick_widget)
+        return self._window_name
+
     def do_get_time_now(self):
         return GLib.get_monotonic_time() / 1_000_000
 
+    def do_get_expected_interval(self, frame_clock: Gdk.FrameClock | None) -> float:
+        if frame_clock is not None:
+            # whatever the display actually refreshes at (120hz, 144hz...)
+            refresh_interval, _ = frame_clock.get_refresh_info(
+                frame_clock.get_frame_time()
+            )
+            if refresh_interval > 0:
+                return refresh_interval / 1_000_000
+        return self._tick_interval / 1000
+
+    def do_measure_frame(
+        self, current_time: float, frame_clock: Gdk.FrameClock | None = None
+    ):
+        if self._last_tick_time is not None:
+            dropped = get_frame_monitor().report(
+                self.get_window_name(),
+                current_time - self._last_tick_time,
+                self.do_get_expected_interval(frame_clock),
+            )
+            self.frames += 1
+            self.dropped_frames += dropped
+        self._last_tick_time = current_time
+        return
+
     def do_update_value(self, delta_time: float):
         if not self._playing:
             return
@@ -198,10 +242,20 @@ class Animator(Service):
 
         self._timeline_pos = min(1.0, elapsed_time / self._duration)
 
+        if get_frame_monitor().degraded and self._timeline_pos < 1.0:
+            # under load, only redraw every other frame
+            self._skip_tick = not self._skip_tick
+            if self._skip_tick:
+                return
+
         self.value = lerp(
             self._min_value,
             self._max_value,
-            self._timing_function(progress=self._timeline_pos),
+            # animations started under load get a plain linear curve, running ones
+            # keep theirs (switching curves halfway through would make it jump)
+            self._timeline_pos
+            if self._degraded
+            else self._timing_function(progress=self._timeline_pos),
         )
 
         if not self._timeline_pos >= 1.0:
@@ -218,8 +272,10 @@ class Animator(Service):
         self._timeline_pos = 0.0
         return
 
-    def do_handle_tick(self, *_):
+    def do_handle_tick(self, *args):
         current_time = self.do_get_time_now()
+        # tick callbacks get (widget, frame_clock), timeouts get nothing
+        self.do_measure_frame(current_time, args[1] if len(args) > 1 else None)
         self.do_update_value(current_time)
         return True
 
@@ -238,8 +294,23 @@ class Animator(Service):
         if self._playing:
             return
 
+        if not self._essential and get_motion_policy().reduced_motion:
+            # jump straight to the end
+            self.do_remove_tick_handlers()
+            self._timeline_pos = 1.0
+            self.value = self._max_value
+            self.finished()
+            return
+
         self.playing = True
         self._start_time = self.do_get_time_now()
+        self._last_tick_time = None
+        self._window_name = None
+        self._skip_tick = False
+
+        monitor = get_frame_monitor()
+        monitor.register(self)
+        self._degraded = monitor.degraded
 
         if self._tick_handler:
             return
@@ -263,3 +334,122 @@ class Animator(Service):
             self.playing = False
             return
         return self.do_remove_tick_handlers()
+
+
+SPRING_MAX_STEP = 1 / 20  # seconds, longer frames get integrated as this
+
+
+def step_spring(
+    displacement: float,
+    velocity: float,
+    delta_time: float,
+    angular_frequency: float,
+    damping_ratio: float,
+) -> tuple[float, float]:
+    # closed form, so it's stable no matter how long the frame took
+    if damping_ratio >= 1.0:
+        decay = math.exp(-angular_frequency * delta_time)
+        b = velocity + angular_frequency * displacement
+        return (
+            (displacement + b * delta_time) * decay,
+            (velocity - angular_frequency * b * delta_time) * decay,
+        )
+
+    damped_frequency = angular_frequency * math.sqrt(1.0 - damping_ratio**2)
+    decay = math.exp(-damping_ratio * angular_frequency * delta_time)
+    cos = math.cos(damped_frequency * delta_time)
+    sin = math.sin(damped_frequency * delta_time)
+    b = (velocity + damping_ratio * angular_frequency * displacement) / damped_frequency
+    return (
+        decay * (displacement * cos + b * sin),
+        decay
+        * (
+            (b * damped_frequency - damping_ratio * angular_frequency * displacement)
+            * cos
+            - (displacement * damped_frequency + damping_ratio * angular_frequency * b)
+            * sin
+        ),
+    )
+
+
+class SpringAnimator(Animator):
+    """
+    A spring driven animator that can be retargeted mid-flight without losing its velocity,
+    `response` is roughly how long (in seconds) it takes to get there and a `damping_ratio`
+    of 1.0 is critically damped (no overshoot). it stops ticking once it comes to rest
+    """
+
+    def __init__(
+        self,
+        response: float = 0.35,
+        damping_ratio: float = 1.0,
+        precision: float = 0.01,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self._angular_frequency = 2 * math.pi / response
+        self._damping_ratio = max(0.05, damping_ratio)
+        self._precision = precision
+        self._velocity = 0.0
+        self._spring_time: float | None = None
+
+    @property
+    def velocity(self) -> float:
+        return self._velocity
+
+    def animate_to(self, target: float):
+        self.max_value = target
+        if self._playing:
+            return  # already moving, just aim somewhere else
+        self._spring_time = None
+        return self.play()
+
+    def jump_to(self, value: float):
+        self.pause()
+        self._velocity = 0.0
+        self.max_value = value
+        self.value = value
+        return
+
+    def do_update_value(self, current_time: float):
+        if not self._playing:
+            return
+
+        if self._spring_time is None:
+            self._spring_time = current_time
+            return
+        delta_time = min(current_time - self._spring_time, SPRING_MAX_STEP)
+
+        if get_frame_monitor().degraded:
+            # under load, only redraw every other frame (the spring catches up by itself)
+            self._skip_tick = not self._skip_tick
+            if self._skip_tick:
+                return
+        self._spring_time = current_time
+
+        displacement, self._velocity = step_spring(
+            self._value - self._max_value,
+            self._velocity,
+            delta_time,
+            self._angular_frequency,
+            self._damping_ratio,
+        )
+
+        if (
+            abs(displacement) < self._precision
+            and abs(self._velocity) < self._precision * self._angular_frequency
+        ):
+            # at rest, stop ticking until the next target
+            self._velocity = 0.0
+            self.value = self._max_value
+            self.pause()
+            self.finished()
+            return
+
+        self.value = self._max_value + displacement
+        return
+
+    def play(self):
+        if not self._essential and get_motion_policy().reduced_motion:
+            self._velocity = 0.0
+        return super().play()
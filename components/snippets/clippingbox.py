@@ -10,6 +10,10 @@ from fabric.widgets.box import Box
 class ClippingBox(Box):
     """A regular `Box` that replicates the CSS behaviour of `overflow: hidden` because GTK failed at it.
 
+    The clipping shape is cached per (width, height, radius, scale) and the radius is only
+    re-queried on style changes. Pass `cache_content=True` for static children to have them
+    rendered (and clipped) once into an offscreen surface, call `invalidate_content` when they change.
+
     NOTE: use instead of the old `CustomImage` snippet.
     """
 
@@ -27,20 +31,91 @@ class ClippingBox(Box):
 
         return cr.close_path()
 
-    def do_draw(self, cr: cairo.Context):
-        cr.save()
-        ClippingBox.render_shape(
-            cr,
-            self.get_allocated_width(),
-            self.get_allocated_height(),
-            cast(
+    def __init__(self, cache_content: bool = False, **kwargs):
+        super().__init__(**kwargs)
+        self._cache_content = cache_content
+
+        self._radius: int | None = None
+        self._shape_key: tuple[int, int, int, int] | None = None
+        self._shape_path: cairo.Path | None = None
+        self._content_surface: cairo.Surface | None = None
+
+        self.connect("style-updated", self.do_invalidate_style)
+        self.connect("state-flags-changed", self.do_invalidate_style)
+        self.connect("add", self.invalidate_content)
+        self.connect("remove", self.invalidate_content)
+
+    def do_invalidate_style(self, *_):
+        self._radius = None
+        self._shape_path = None
+        self.invalidate_content()
+        return
+
+    def invalidate_content(self, *_):
+        if self._content_surface is None:
+            return
+        self._content_surface = None
+        self.queue_draw()
+        return
+
+    def do_size_allocate(self, allocation):
+        if self._shape_key and self._shape_key[:2] != (
+            allocation.width,
+            allocation.height,
+        ):
+            self._shape_path = None
+            self._content_surface = None
+        return Box.do_size_allocate(self, allocation)
+
+    def do_get_radius(self) -> int:
+        if self._radius is None:
+            self._radius = cast(
                 int,
                 self.get_style_context().get_property(
                     "border-radius", self.get_state_flags()
                 ),
-            ),
+            )
+        return self._radius
+
+    def do_apply_clip(self, cr: cairo.Context, width: int, height: int):
+        key = (width, height, self.do_get_radius(), self.get_scale_factor())
+        if self._shape_path is None or key != self._shape_key:
+            cr.new_path()
+            ClippingBox.render_shape(cr, width, height, key[2])
+            self._shape_path = cr.copy_path()
+            self._shape_key = key
+        else:
+            cr.new_path()
+            cr.append_path(self._shape_path)
+        return cr.clip()
+
+    def do_render_content(self, width: int, height: int) -> cairo.Surface | None:
+        if not (window := self.get_window()):
+            return None
+
+        surface = window.create_similar_image_surface(
+            cairo.FORMAT_ARGB32, width, height, self.get_scale_factor()
         )
-        cr.clip()
+        cr = cairo.Context(surface)
+        self.do_apply_clip(cr, width, height)
+        Box.do_draw(self, cr)
+        return surface
+
+    def do_draw(self, cr: cairo.Context):
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+
+        if self._cache_content:
+            if self._content_surface is None:
+                self._content_surface = self.do_render_content(width, height)
+            if self._content_surface is not None:
+                # already clipped, just blit it
+                cr.set_source_surface(self._content_surface, 0, 0)
+                cr.paint()
+                return True
+
+        cr.save()
+        self.do_apply_clip(cr, width, height)
 
         Box.do_draw(self, cr)
 
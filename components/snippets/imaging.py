@@ -0,0 +1,99 @@
+# Author: Yousef EL-Darsh
+# License (SPDX): AGPL-3.0-or-later
+
+import queue
+from functools import cache
+from collections.abc import Callable
+from typing import Any
+from fabric.utils import idle_add
+from loguru import logger
+
+from gi.repository import GdkPixbuf, GLib, Gtk
+
+
+class ImageDecoder:
+    """
+    A single worker thread for decoding and scaling images off the main loop,
+    results are handed back to the main thread through `idle_add`
+    """
+
+    def __init__(self, name: str = "fabrika-image-decoder"):
+        self._name = name
+        self._jobs: queue.Queue[tuple[Callable, Callable, tuple]] = queue.Queue()
+        self._thread = None
+
+    def submit(self, func: Callable[..., Any], callback: Callable[[Any], Any], *args):
+        if self._thread is None:
+            self._thread = GLib.Thread.new(self._name, self.do_handle_jobs)
+        self._jobs.put((func, callback, args))
+        return
+
+    def do_handle_jobs(self):
+        while True:
+            func, callback, args = self._jobs.get()
+            try:
+                result = func(*args)
+            except Exception as e:
+                logger.warning(f"[ImageDecoder] Failed to decode an image: {e}")
+                result = None
+            idle_add(self.do_deliver, callback, result)
+
+    def do_deliver(self, callback: Callable[[Any], Any], result: Any):
+        callback(result)
+        return False
+
+
+def decode_pixmap(
+    data: bytes,
+    width: int,
+    height: int,
+    rowstride: int,
+    has_alpha: bool,
+    bits_per_sample: int,
+    size: tuple[int, int],
+) -> GdkPixbuf.Pixbuf | None:
+    # one copy into a GBytes to wrap, the scaled pixbuf is the only allocation we keep
+    pixbuf = GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(data),
+        GdkPixbuf.Colorspace.RGB,
+        has_alpha,
+        bits_per_sample,
+        width,
+        height,
+        rowstride,
+    )
+    return pixbuf.scale_simple(*size, GdkPixbuf.InterpType.BILINEAR)
+
+
+def decode_file(
+    path: str, size: tuple[int, int], preserve_aspect_ratio: bool = False
+) -> GdkPixbuf.Pixbuf | None:
+    # decodes straight into the target size, no full-sized intermediate
+    return GdkPixbuf.Pixbuf.new_from_file_at_scale(path, *size, preserve_aspect_ratio)
+
+
+@cache
+def get_image_decoder() -> ImageDecoder:
+    return ImageDecoder()
+
+
+@cache
+def get_icon_pixbuf(icon_name: str, size: int) -> GdkPixbuf.Pixbuf | None:
+    """Looks up (and keeps) an icon from the default theme"""
+    icon_info = get_icon_theme().lookup_icon(
+        icon_name, size, Gtk.IconLookupFlags.FORCE_SIZE
+    )
+    if icon_info is None:
+        return None
+    try:
+        return icon_info.load_icon()
+    except GLib.Error:
+        return None
+
+
+@cache
+def get_icon_theme() -> Gtk.IconTheme:
+    theme = Gtk.IconTheme.get_default()
+    # new theme, stale icons
+    theme.connect("changed", lambda *_: get_icon_pixbuf.cache_clear())
+    return theme
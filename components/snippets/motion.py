@@ -0,0 +1,135 @@
+# Author: Yousef EL-Darsh
+# License (SPDX): AGPL-3.0-or-later
+
+import weakref
+from collections import deque
+from functools import cache
+from fabric.core.service import Service, Property
+
+from gi.repository import Gtk
+
+
+class FrameMonitor(Service):
+    """
+    Collects frame intervals reported by running animators and flips into
+    a `degraded` state when too many frames are being dropped, animators and
+    widgets can then cut down on their work until things settle again
+    """
+
+    @Property(bool, "read-write", default_value=False)
+    def degraded(self):
+        return self._degraded
+
+    @degraded.setter
+    def degraded(self, value: bool):  # this setter is intended for internal usage only
+        self._degraded = value
+        return
+
+    def __init__(self, window_size: int = 120, drop_ratio: float = 0.2, **kwargs):
+        super().__init__(**kwargs)
+        self._degraded = False
+        self._drop_ratio = drop_ratio
+        self._window_size = window_size
+
+        # sliding window of dropped frames per tick, across all animators
+        self._recent: deque[int] = deque(maxlen=window_size)
+        self._recent_dropped = 0
+
+        self._windows: dict[str, list[int]] = {}  # name -> [frames, dropped]
+        self._animators = weakref.WeakSet()
+
+    def register(self, animator) -> None:
+        self._animators.add(animator)
+        return
+
+    def report(self, window_name: str, interval: float, expected: float) -> int:
+        # anything under 1.5 frames is just jitter
+        dropped = (
+            max(0, round(interval / expected) - 1) if interval > expected * 1.5 else 0
+        )
+
+        stats = self._windows.setdefault(window_name, [0, 0])
+        stats[0] += 1
+        stats[1] += dropped
+
+        if len(self._recent) == self._window_size:
+            self._recent_dropped -= self._recent[0]
+        self._recent.append(dropped)
+        self._recent_dropped += dropped
+
+        ratio = self._recent_dropped / (len(self._recent) + self._recent_dropped)
+        if not self._degraded:
+            # wait for a decent sample before judging
+            if len(self._recent) >= self._window_size // 4 and ratio > self._drop_ratio:
+                self.degraded = True
+        elif ratio < self._drop_ratio / 2:
+            self.degraded = False
+
+        return dropped
+
+    def reset(self) -> None:
+        self._recent.clear()
+        self._recent_dropped = 0
+        self._windows.clear()
+        for animator in self._animators:
+            animator.frames = 0
+            animator.dropped_frames = 0
+        self.degraded = False
+        return
+
+    def get_stats(self) -> dict:
+        return {
+            "degraded": self._degraded,
+            "windows": {
+                name: {"frames": frames, "dropped": dropped}
+                for name, (frames, dropped) in self._windows.items()
+            },
+            "animators": [
+                {
+                    "window": animator.get_window_name(),
+                    "frames": animator.frames,
+                    "dropped": animator.dropped_frames,
+                }
+                for animator in self._animators
+                if animator.frames
+            ],
+        }
+
+
+class MotionPolicy(Service):
+    """
+    Global switch for eye-candy, when `reduced_motion` is set animators complete
+    instantly and widgets should drop anything decorative or poll less often
+    """
+
+    @Property(bool, "read-write", default_value=False)
+    def reduced_motion(self):
+        return self._reduced_motion
+
+    @reduced_motion.setter
+    def reduced_motion(self, value: bool):
+        self._reduced_motion = value
+        return
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._reduced_motion = False
+
+
+def get_window_name_for_widget(widget: Gtk.Widget | None) -> str:
+    if widget is None:
+        return "timers"
+    toplevel = widget.get_toplevel()
+    if not isinstance(toplevel, Gtk.Window):
+        return "unmapped"
+    return toplevel.get_title() or toplevel.get_name() or "unnamed"
+
+
+@cache
+def get_frame_monitor() -> FrameMonitor:
+    return FrameMonitor()
+
+
+@cache
+def get_motion_policy() -> MotionPolicy:
+    return MotionPolicy()
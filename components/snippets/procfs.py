@@ -0,0 +1,318 @@
+# Author: Yousef EL-Darsh
+# License (SPDX): AGPL-3.0-or-later
+
+import os
+import time
+import heapq
+import psutil
+from operator import attrgetter
+from typing import NamedTuple
+
+PROC_STAT_LINE_SIZE = 160  # generous size of a single "cpuN ..." line
+PROC_IGNORED_DISKS = (b"loop", b"ram", b"zram", b"dm-")
+PROC_IGNORED_NICS = (b"lo",)
+PROC_SECTOR_SIZE = 512  # /proc/diskstats always counts in 512 byte sectors
+
+
+class CpuTimes(NamedTuple):
+    busy: int
+    total: int
+
+
+class SystemCounters(NamedTuple):
+    cpu: CpuTimes
+    cpu_cores: tuple[CpuTimes, ...]
+    memory: float  # fraction in use
+    swap: float
+    net_rx: int  # bytes so far
+    net_tx: int
+    disk_read: int
+    disk_write: int
+
+
+class ProcFile:
+    """Keeps a /proc (or /sys) file open and re-reads it with `preadv` into the same buffer"""
+
+    __slots__ = ("path", "fd", "buffer")
+
+    def __init__(self, path: str, size: int = 4096):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY | os.O_CLOEXEC)
+        self.buffer = bytearray(size)
+
+    def read(self) -> memoryview:
+        while (length := os.preadv(self.fd, [self.buffer], 0)) == len(self.buffer):
+            # filled it up, the file must've grown (more interfaces, disks, etc.)
+            self.buffer = bytearray(len(self.buffer) * 2)
+        return memoryview(self.buffer)[:length]
+
+    def read_head(self) -> memoryview:
+        # for when only the beginning matters, whatever fits is enough
+        return memoryview(self.buffer)[: os.preadv(self.fd, [self.buffer], 0)]
+
+    def close(self):
+        os.close(self.fd)
+        return
+
+
+def parse_cpu_times(line: bytes) -> CpuTimes:
+    # user nice system idle iowait irq softirq steal (guest time is already in user)
+    fields = line.split(None, 9)
+    values = [int(field) for field in fields[1:9]]
+    return CpuTimes(sum(values) - values[3] - values[4], sum(values))
+
+
+def parse_meminfo_field(data: bytes, key: bytes) -> int:
+    start = data.index(key) + len(key)
+    return int(data[start : data.index(b"\n", start)].split()[0])
+
+
+class ProcMetrics:
+    """
+    Reads exactly what the bar shows from /proc through persistent file descriptors,
+    only the fields in use get parsed
+    """
+
+    def __init__(self):
+        cores = os.cpu_count() or 1
+        self._stat = ProcFile("/proc/stat", PROC_STAT_LINE_SIZE * (cores + 2))
+        self._meminfo = ProcFile("/proc/meminfo", 8192)
+        self._net_dev = ProcFile("/proc/net/dev", 4096)
+        self._diskstats = ProcFile("/proc/diskstats", 8192)
+        # whole disks only, partitions are already accounted for in them
+        self._disks = {
+            name.encode()
+            for name in os.listdir("/sys/block")
+            if not name.encode().startswith(PROC_IGNORED_DISKS)
+        }
+
+    def read_cpu(self) -> tuple[CpuTimes, tuple[CpuTimes, ...]]:
+        data = bytes(self._stat.read_head())
+        lines = data[: data.find(b"\nintr")].split(b"\n")
+        cores = tuple(
+            parse_cpu_times(line)
+            for line in lines[1:]
+            # a line cut in half by the buffer gets skipped
+            if line.startswith(b"cpu") and line.count(b" ") >= 8
+        )
+        return parse_cpu_times(lines[0]), cores
+
+    def read_memory(self) -> tuple[float, float]:
+        data = bytes(self._meminfo.read())
+        total = parse_meminfo_field(data, b"MemTotal:")
+        available = parse_meminfo_field(data, b"MemAvailable:")
+        swap_total = parse_meminfo_field(data, b"SwapTotal:")
+        swap_free = parse_meminfo_field(data, b"SwapFree:")
+        return (
+            (total - available) / total if total else 0.0,
+            (swap_total - swap_free) / swap_total if swap_total else 0.0,
+        )
+
+    def read_net(self) -> tuple[int, int]:
+        rx = tx = 0
+        # two header lines, then "iface: rx_bytes ... (8 fields) tx_bytes ..."
+        for line in bytes(self._net_dev.read()).split(b"\n")[2:]:
+            name, _, values = line.partition(b":")
+            if not values or name.strip() in PROC_IGNORED_NICS:
+                continue
+            fields = values.split(None, 9)
+            rx += int(fields[0])
+            tx += int(fields[8])
+        return rx, tx
+
+    def read_disk(self) -> tuple[int, int]:
+        read = written = 0
+        # "major minor name reads merged sectors_read ms writes merged sectors_written ..."
+        for line in bytes(self._diskstats.read()).split(b"\n"):
+            fields = line.split(None, 10)
+            if len(fields) < 10 or fields[2] not in self._disks:
+                continue
+            read += int(fields[5])
+            written += int(fields[9])
+        return read * PROC_SECTOR_SIZE, written * PROC_SECTOR_SIZE
+
+    def read(self) -> SystemCounters:
+        cpu, cores = self.read_cpu()
+        return SystemCounters(
+            cpu, cores, *self.read_memory(), *self.read_net(), *self.read_disk()
+        )
+
+
+class PsutilMetrics:
+    """Same as `ProcMetrics` but through psutil, for when /proc isn't around (or readable)"""
+
+    @staticmethod
+    def get_cpu_times(times) -> CpuTimes:
+        total = sum(times)
+        # guest times are included in user already (on linux at least)
+        total -= getattr(times, "guest", 0) + getattr(times, "guest_nice", 0)
+        idle = times.idle + getattr(times, "iowait", 0)
+        return CpuTimes(round((total - idle) * 100), round(total * 100))
+
+    def read(self) -> SystemCounters:
+        nics = psutil.net_io_counters(pernic=True)
+        disk = psutil.disk_io_counters()
+        rx = tx = 0
+        for name, counters in nics.items():
+            if name.encode() in PROC_IGNORED_NICS:
+                continue
+            rx += counters.bytes_recv
+            tx += counters.bytes_sent
+        return SystemCounters(
+            self.get_cpu_times(psutil.cpu_times()),
+            tuple(self.get_cpu_times(times) for times in psutil.cpu_times(percpu=True)),
+            psutil.virtual_memory().percent / 100,
+            psutil.swap_memory().percent / 100,
+            rx,
+            tx,
+            disk.read_bytes if disk else 0,
+            disk.write_bytes if disk else 0,
+        )
+
+
+class ProcessInfo:
+    __slots__ = (
+        "pid",
+        "start_time",
+        "name",
+        "uid",
+        "cpu_ticks",
+        "cpu",
+        "rss",
+        "_cmdline",
+    )
+
+    def __init__(self, pid: int, start_time: int, name: str, uid: int):
+        self.pid = pid
+        self.start_time = start_time  # in ticks since boot, tells reused pids apart
+        self.name = name
+        self.uid = uid
+        self.cpu_ticks = -1  # not sampled yet
+        self.cpu = 0.0  # fraction of all cpus
+        self.rss = 0  # bytes
+        self._cmdline: str | None = None
+
+    @property
+    def cmdline(self) -> str:
+        # only ever read for the few processes that get shown, then kept
+        if self._cmdline is None:
+            try:
+                with open(f"/proc/{self.pid}/cmdline", "rb") as f:
+                    cmdline = f.read().replace(b"\0", b" ")
+                self._cmdline = cmdline.decode(errors="replace").strip()
+            except OSError:
+                self._cmdline = ""
+        return self._cmdline or self.name
+
+
+class ProcessTable:
+    """
+    A process table that's maintained incrementally, pids are diffed between updates
+    and static fields are read once per process, only `/proc/<pid>/stat` gets re-read
+    """
+
+    def __init__(self):
+        self.processes: dict[int, ProcessInfo] = {}
+        self._ticks_per_second = os.sysconf("SC_CLK_TCK")
+        self._page_size = os.sysconf("SC_PAGE_SIZE")
+        self._cpus = os.cpu_count() or 1
+        self._last_time: float | None = None
+
+    @staticmethod
+    def read_stat(pid: int) -> bytes | None:
+        try:
+            fd = os.open(f"/proc/{pid}/stat", os.O_RDONLY | os.O_CLOEXEC)
+        except OSError:
+            return None
+        try:
+            return os.read(fd, 1024)
+        except OSError:
+            return None
+        finally:
+            os.close(fd)
+
+    def update(self):
+        now = time.monotonic()
+        elapsed = now - self._last_time if self._last_time is not None else 0.0
+        self._last_time = now
+        tick_budget = elapsed * self._ticks_per_second * self._cpus
+
+        with os.scandir("/proc") as it:
+            pids = {int(entry.name) for entry in it if entry.name.isdigit()}
+        for pid in self.processes.keys() - pids:
+            del self.processes[pid]
+
+        for pid in pids:
+            if (stat := self.read_stat(pid)) is None:
+                self.processes.pop(pid, None)  # gone in the meantime
+                continue
+
+            # the name is in parentheses and might contain anything, even more of them
+            name_end = stat.rfind(b")")
+            fields = stat[name_end + 2 :].split(None, 22)
+            # fields are counted from after the name: utime (11), stime (12),
+            # starttime (19) and rss (21)
+            start_time = int(fields[19])
+
+            info = self.processes.get(pid)
+            if info is None or info.start_time != start_time:
+                # new, or the pid got reused by another process, nothing carries over
+                try:
+                    uid = os.stat(f"/proc/{pid}").st_uid
+                except OSError:
+                    self.processes.pop(pid, None)
+                    continue
+                info = self.processes[pid] = ProcessInfo(
+                    pid,
+                    start_time,
+                    stat[stat.find(b"(") + 1 : name_end].decode(errors="replace"),
+                    uid,
+                )
+
+            ticks = int(fields[11]) + int(fields[12])
+            info.cpu = (
+                (ticks - info.cpu_ticks) / tick_budget
+                if info.cpu_ticks >= 0 and tick_budget
+                else 0.0
+            )
+            info.cpu_ticks = ticks
+            info.rss = int(fields[21]) * self._page_size
+        return
+
+    def get_top(self, key: str, count: int) -> list[ProcessInfo]:
+        return heapq.nlargest(count, self.processes.values(), key=attrgetter(key))
+
+
+def get_cpu_usage(previous: CpuTimes, current: CpuTimes) -> float:
+    if (total := current.total - previous.total) <= 0:
+        return 0.0
+    return min(max((current.busy - previous.busy) / total, 0.0), 1.0)
+
+
+def new_metrics_backend() -> ProcMetrics | PsutilMetrics:
+    try:
+        backend = ProcMetrics()
+        backend.read()
+        return backend
+    except (OSError, ValueError, IndexError):
+        return PsutilMetrics()
+
+
+if __name__ == "__main__":
+    # microbenchmark, run with `python -m components.snippets.procfs`
+    import timeit
+
+    def read_psutil_previous():
+        # what SystemStatus used to do every tick
+        psutil.cpu_percent()
+        psutil.virtual_memory()
+
+    procfs, fallback = ProcMetrics(), PsutilMetrics()
+    for name, func in (
+        ("procfs (persistent fds)", procfs.read),
+        ("psutil (fallback backend)", fallback.read),
+        ("psutil (previous path)", read_psutil_previous),
+    ):
+        runs = 2000
+        elapsed = min(timeit.repeat(func, number=runs, repeat=5))
+        print(f"{name:<28} {elapsed / runs * 1_000_000:8.1f} µs per sample")
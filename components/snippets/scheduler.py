@@ -0,0 +1,160 @@
+# Author: Yousef EL-Darsh
+# License (SPDX): AGPL-3.0-or-later
+
+import heapq
+import itertools
+from functools import cache
+from collections.abc import Callable
+
+from gi.repository import GLib
+
+
+class DeadlineEntry:
+    __slots__ = ("deadline", "handle", "callback", "args", "pausable", "remaining")
+
+    def __init__(
+        self,
+        deadline: float,
+        handle: int,
+        callback: Callable,
+        args: tuple,
+        pausable: bool,
+    ):
+        self.deadline = deadline
+        self.handle = handle
+        self.callback: Callable | None = callback
+        self.args = args
+        self.pausable = pausable
+        self.remaining = 0.0
+
+    def __lt__(self, other: "DeadlineEntry") -> bool:
+        return (self.deadline, self.handle) < (other.deadline, other.handle)
+
+
+class DeadlineScheduler:
+    """
+    Serves any number of one-shot deadlines from a single GLib source that only
+    wakes up for the nearest one, pausable entries can be frozen (e.g. on hover)
+    and resumed later with whatever time they had left
+    """
+
+    def __init__(self):
+        self._heap: list[DeadlineEntry] = []
+        self._entries: dict[int, DeadlineEntry] = {}
+        self._paused: list[DeadlineEntry] | None = None
+        self._handles = itertools.count(1)
+        self._source: int = 0
+        self._armed_for: float | None = None
+
+    @staticmethod
+    def get_time_now() -> float:
+        return GLib.get_monotonic_time() / 1_000
+
+    @property
+    def paused(self) -> bool:
+        return self._paused is not None
+
+    def schedule(
+        self, timeout: int, callback: Callable, *args, pausable: bool = False
+    ) -> int:
+        """Calls `callback` once after `timeout` milliseconds, returns a handle for `cancel`"""
+        handle = next(self._handles)
+        entry = DeadlineEntry(
+            self.get_time_now() + timeout, handle, callback, args, pausable
+        )
+        self._entries[handle] = entry
+
+        if pausable and self._paused is not None:
+            entry.remaining = timeout
+            self._paused.append(entry)
+            return handle
+
+        heapq.heappush(self._heap, entry)
+        self.do_arm()
+        return handle
+
+    def cancel(self, handle: int):
+        if not (entry := self._entries.pop(handle, None)):
+            return
+        # let go of whatever the callback holds, the heap slot is dropped lazily
+        entry.callback = None
+        entry.args = ()
+        if self._paused is not None and entry in self._paused:
+            self._paused.remove(entry)
+
+        if len(self._heap) > 2 * len(self._entries) + 16:
+            self._heap = [e for e in self._heap if e.callback is not None]
+            heapq.heapify(self._heap)
+        return self.do_arm()
+
+    def pause(self):
+        if self._paused is not None:
+            return
+        now = self.get_time_now()
+        self._paused = []
+        kept: list[DeadlineEntry] = []
+        for entry in self._heap:
+            if entry.callback is None:
+                continue
+            if entry.pausable:
+                entry.remaining = max(0.0, entry.deadline - now)
+                self._paused.append(entry)
+            else:
+                kept.append(entry)
+        heapq.heapify(kept)
+        self._heap = kept
+        return self.do_arm()
+
+    def resume(self):
+        if self._paused is None:
+            return
+        now = self.get_time_now()
+        for entry in self._paused:
+            entry.deadline = now + entry.remaining
+            heapq.heappush(self._heap, entry)
+        self._paused = None
+        return self.do_arm()
+
+    def do_arm(self):
+        while self._heap and self._heap[0].callback is None:
+            heapq.heappop(self._heap)
+
+        next_deadline = self._heap[0].deadline if self._heap else None
+        if next_deadline == self._armed_for and (self._source or next_deadline is None):
+            return
+
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+        self._armed_for = next_deadline
+
+        if next_deadline is None:
+            return
+        self._source = GLib.timeout_add(
+            max(0, round(next_deadline - self.get_time_now())), self.do_fire
+        )
+        return
+
+    def do_fire(self) -> bool:
+        self._source = 0
+        self._armed_for = None
+        now = self.get_time_now()
+
+        # anything within a millisecond is due, saves a wakeup
+        while self._heap and self._heap[0].deadline <= now + 1:
+            entry = heapq.heappop(self._heap)
+            if (callback := entry.callback) is None:
+                continue
+            self._entries.pop(entry.handle, None)
+            args = entry.args
+            entry.callback = None
+            entry.args = ()
+            callback(*args)
+
+        self.do_arm()
+        return False
+
+
+@cache
+def get_deadline_scheduler() -> DeadlineScheduler:
+    return DeadlineScheduler()
@@ -0,0 +1,91 @@
+# Author: Yousef EL-Darsh
+# License (SPDX): AGPL-3.0-or-later
+
+import cairo
+from array import array
+from fabric.widgets.widget import Widget
+from gi.repository import Gtk
+
+
+class RingBuffer:
+    """A fixed-size history of floats, preallocated once and overwritten in place"""
+
+    __slots__ = ("size", "count", "values")
+
+    def __init__(self, size: int):
+        self.size = size
+        self.count = 0  # samples pushed so far, the newest sits at `count - 1`
+        self.values = array("d", bytes(8 * size))
+
+    def push(self, value: float):
+        self.values[self.count % self.size] = value
+        self.count += 1
+        return
+
+    @property
+    def latest(self) -> float:
+        return self.values[(self.count - 1) % self.size] if self.count else 0.0
+
+    def get_max(self) -> float:
+        return max(self.values) if self.count else 0.0
+
+
+class Sparkline(Gtk.DrawingArea, Widget):
+    """
+    Draws the history held by one (or more, stacked) `RingBuffer`s as a line,
+    values are mapped against `max_value` or the buffers' own peak if it's `None`.
+    the line takes the widget's CSS color
+    """
+
+    def __init__(
+        self,
+        buffers: RingBuffer | list[RingBuffer],
+        max_value: float | None = 1.0,
+        line_width: float = 1.5,
+        **kwargs,
+    ):
+        Gtk.DrawingArea.__init__(self)
+        Widget.__init__(self, **kwargs)
+        self._buffers = buffers if isinstance(buffers, list) else [buffers]
+        self._max_value = max_value
+        self._line_width = line_width
+
+    def do_draw(self, cr: cairo.Context):
+        width = self.get_allocated_width()
+        height = self.get_allocated_height()
+        context = self.get_style_context()
+        Gtk.render_background(context, cr, 0, 0, width, height)
+
+        color = context.get_color(self.get_state_flags())
+        cr.set_line_width(self._line_width)
+        cr.set_line_join(cairo.LINE_JOIN_ROUND)
+
+        inset = self._line_width / 2
+        usable_height = height - self._line_width
+        for i, buffer in enumerate(self._buffers):
+            if buffer.count < 2:
+                continue
+            peak = self._max_value or buffer.get_max() or 1.0
+            size = buffer.size
+            samples = min(buffer.count, size)
+            first = buffer.count - samples
+            step = width / (size - 1)
+            x = width - (samples - 1) * step
+
+            # straight from the buffer, no intermediate lists
+            values = buffer.values
+            cr.move_to(
+                x, height - inset - min(values[first % size] / peak, 1.0) * usable_height
+            )
+            for n in range(first + 1, buffer.count):
+                x += step
+                cr.line_to(
+                    x, height - inset - min(values[n % size] / peak, 1.0) * usable_height
+                )
+
+            # the first buffer is the main one, the rest are dimmed
+            cr.set_source_rgba(
+                color.red, color.green, color.blue, color.alpha * (1.0 if not i else 0.5)
+            )
+            cr.stroke()
+        return False
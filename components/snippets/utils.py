@@ -4,7 +4,8 @@ from collections.abc import Callable
 from typing import TypeVar, Iterable, NamedTuple, cast
 
 from fabric.widgets.box import Box
-from fabric.utils import invoke_repeater
+
+from .scheduler import get_deadline_scheduler
 
 from gi.repository import Gtk
 
@@ -49,9 +50,132 @@ def iter_search(iter: Iterable[T], search_func: Callable[[T], bool]) -> T | None
     return next((item for item in iter if search_func(item)), None)
 
 
-def multiply_height_for_child(container: Box, child: Gtk.Widget, n_child: int) -> int:
+class HeightCache:
+    """
+    Caches the preferred heights of a container's children and keeps a running prefix sum
+    of them, a measurement is only redone when its widget gets re-allocated with a new
+    height or restyled, and "the first N children" height is a lookup after that
+    """
+
+    def __init__(
+        self,
+        container: Box,
+        target_func: Callable[[Gtk.Widget], Gtk.Widget] | None = None,
+    ):
+        self._container = container
+        # maps a child to the widget that actually gets measured
+        self._target_func = target_func
+
+        self._heights: dict[Gtk.Widget, int] = {}
+        self._allocated: dict[Gtk.Widget, int] = {}
+        self._handlers: dict[Gtk.Widget, list[tuple[Gtk.Widget, int]]] = {}
+
+        self._children: list[Gtk.Widget] | None = None
+        self._index: dict[Gtk.Widget, int] = {}
+        self._prefix: list[int] = []
+        self._valid = 0  # number of prefix entries that are up-to-date
+
+        container.connect("add", self.on_child_added)
+        container.connect("remove", self.on_child_removed)
+
+    def do_invalidate_order(self, *_):
+        self._children = None
+        self._valid = 0
+        return
+
+    def do_invalidate_child(self, child: Gtk.Widget):
+        self._heights.pop(child, None)
+        if (index := self._index.get(child)) is not None:
+            self._valid = min(self._valid, index)
+        return
+
+    def on_child_added(self, _, child: Gtk.Widget):
+        self.do_watch(child)
+        return self.do_invalidate_order()
+
+    def on_child_removed(self, _, child: Gtk.Widget):
+        self.do_invalidate_child(child)
+        self._allocated.pop(child, None)
+        for widget, handler_id in self._handlers.pop(child, ()):
+            if widget.handler_is_connected(handler_id):
+                widget.disconnect(handler_id)
+        return self.do_invalidate_order()
+
+    def on_target_allocated(self, _, allocation, child: Gtk.Widget):
+        if self._allocated.get(child) == allocation.height:
+            return
+        self._allocated[child] = allocation.height
+        return self.do_invalidate_child(child)
+
+    def do_get_target(self, child: Gtk.Widget) -> Gtk.Widget:
+        return self._target_func(child) if self._target_func else child
+
+    def do_watch(self, child: Gtk.Widget):
+        if child in self._handlers:
+            return
+        target = self.do_get_target(child)
+        self._handlers[child] = [
+            (target, target.connect("size-allocate", self.on_target_allocated, child)),
+            (
+                target,
+                target.connect(
+                    "style-updated", lambda *_: self.do_invalidate_child(child)
+                ),
+            ),
+            # reordering doesn't emit add/remove on the container
+            (child, child.connect("child-notify::position", self.do_invalidate_order)),
+            # hidden children take no space
+            (child, child.connect("notify::visible", self.do_invalidate_order)),
+        ]
+        return
+
+    def measure(self, child: Gtk.Widget) -> int:
+        if (height := self._heights.get(child)) is not None:
+            return height
+
+        # children added before we were around
+        self.do_watch(child)
+
+        height = self.do_get_target(child).get_preferred_size().minimum_size.height  # type: ignore
+        self._heights[child] = height
+        return height
+
+    def get_height_limit(self, max_n_children: int) -> int:
+        if self._children is None:
+            self._children = [
+                child for child in self._container.get_children() if child.get_visible()
+            ]
+            self._index = {child: i for i, child in enumerate(self._children)}
+            self._prefix = [0] * len(self._children)
+            self._valid = 0
+
+        n_children = min(max_n_children, len(self._children))
+        if n_children < 1:
+            return 0
+
+        for i in range(self._valid, n_children):
+            self._prefix[i] = (self._prefix[i - 1] if i else 0) + self.measure(
+                self._children[i]
+            )
+        self._valid = max(self._valid, n_children)
+
+        return (self._container.get_spacing() * (n_children - 1)) + self._prefix[
+            n_children - 1
+        ]
+
+
+def multiply_height_for_child(
+    container: Box,
+    child: Gtk.Widget,
+    n_child: int,
+    cache: HeightCache | None = None,
+) -> int:
     spacing: int = container.get_spacing()
-    child_height: int = child.get_preferred_size().minimum_size.height  # type: ignore
+    child_height: int = (
+        cache.measure(child)
+        if cache
+        else child.get_preferred_size().minimum_size.height  # type: ignore
+    )
 
     height: int = (spacing * (n_child - 1)) + (child_height * n_child)
 
@@ -62,7 +186,11 @@ def get_children_height_limit(
     viewport: Box,
     max_n_children: int,
     transform_func: Callable[[Gtk.Widget], cairo.RectangleInt] | None = None,
+    cache: HeightCache | None = None,
 ) -> int:
+    if cache:
+        return cache.get_height_limit(max_n_children)
+
     spacing: int = viewport.get_spacing()
 
     children = viewport.children
@@ -93,6 +221,7 @@ def get_children_height_limit(
 
 
 def add_style_class_lazy(widget: Gtk.Widget, class_name: str | Iterable[str]) -> int:
-    return invoke_repeater(
-        50, lambda: widget.add_style_class(class_name), initial_call=False
+    # shares a single timer with everyone else instead of a source per call
+    return get_deadline_scheduler().schedule(
+        50, widget.add_style_class, class_name  # type: ignore
     )
@@ -1,8 +1,9 @@
 # Author: Yousef EL-Darsh
 # License (SPDX): CC-BY-NC-ND-4.0
 
+import math
 import cairo
-from typing import Any
+from typing import Any, cast
 from functools import partial
 from fabric.widgets.widget import Widget
 from fabric.widgets.overlay import Overlay
@@ -29,7 +30,7 @@ class TailRail(Gtk.DrawingArea, Widget):
             }
             | animator_kwargs,
             tick_widget=self,
-            notify_value=lambda *_: self.queue_draw(),
+            notify_value=self.on_animator_change,
         )
 
         self._tail_animator = Animator(
@@ -39,13 +40,20 @@ class TailRail(Gtk.DrawingArea, Widget):
             }
             | tail_animator_kwargs,
             tick_widget=self,
-            notify_value=lambda *_: self.queue_draw(),
+            notify_value=self.on_animator_change,
         )
 
         self._buffer_box = Rectangle(0, 0, 0, 0)
         self._from_box = Rectangle(0, 0, 0, 0)
         self._to_box = Rectangle(0, 0, 0, 0)
 
+        # rendered style templates (three-slice), keyed by the rail's height
+        self._style_cache: dict[int, tuple[cairo.ImageSurface, int]] = {}
+
+        self.connect("style-updated", self.do_invalidate_style_cache)
+        self.connect("state-flags-changed", self.do_invalidate_style_cache)
+        self.connect("notify::scale-factor", self.do_invalidate_style_cache)
+
     def animate(self, from_box: Rectangle, to_box: Rectangle):
         self._animator.pause()
         self._tail_animator.pause()
@@ -59,17 +67,24 @@ class TailRail(Gtk.DrawingArea, Widget):
         self._animator.play()
         self._tail_animator.play()
 
-    def do_realize(self, *_):
-        Gtk.DrawingArea.do_realize(self)
-        if window := self.get_window():
-            window.set_pass_through(True)
-        return
+    def on_animator_change(self, *_):
+        old_box = self._buffer_box
+        self._buffer_box = self.do_compute_box()
 
-    def do_draw(self, cr: cairo.Context):
-        cr.save()
-        context = self.get_style_context()
-        cr.set_antialias(cairo.Antialias.BEST)
+        # only invalidate what the rail covered and what it's going to cover
+        left = math.floor(min(old_box.x, self._buffer_box.x)) - 1
+        top = math.floor(min(old_box.y, self._buffer_box.y)) - 1
+        right = math.ceil(
+            max(old_box.x + old_box.width, self._buffer_box.x + self._buffer_box.width)
+        )
+        bottom = math.ceil(
+            max(
+                old_box.y + old_box.height, self._buffer_box.y + self._buffer_box.height
+            )
+        )
+        return self.queue_draw_area(left, top, right - left + 2, bottom - top + 2)
 
+    def do_compute_box(self) -> Rectangle:
         leading_progress = self._animator.value
         trailing_progress = self._tail_animator.value
 
@@ -99,19 +114,96 @@ class TailRail(Gtk.DrawingArea, Widget):
             current_top = lerp(top_edge_start, top_edge_end, leading_progress)
             current_bottom = lerp(bottom_edge_start, bottom_edge_end, trailing_progress)
 
-        self._buffer_box = Rectangle(
+        return Rectangle(
             current_left,
             current_top,
             current_right - current_left,
             current_bottom - current_top,
         )
 
-        if self._buffer_box.width > 0:
-            # cr.rectangle(*self._buffer_box)
-            # cr.clip()
+    def do_invalidate_style_cache(self, *_):
+        self._style_cache.clear()
+        return
+
+    def do_get_style_template(self, height: int) -> tuple[cairo.ImageSurface, int]:
+        if cached := self._style_cache.get(height):
+            return cached
+
+        context = self.get_style_context()
+        state = self.get_state_flags()
+        border = context.get_border(state)  # type: ignore
+        radius = cast(int, context.get_property("border-radius", state))
+
+        # width of the caps that can't be stretched (corners and borders)
+        cap = math.ceil(min(radius, height / 2)) + max(border.left, border.right)  # type: ignore
+        width = cap * 2 + 1
+        scale = self.get_scale_factor()
+
+        surface = cairo.ImageSurface(cairo.FORMAT_ARGB32, width * scale, height * scale)
+        surface.set_device_scale(scale, scale)
+        cr = cairo.Context(surface)
+        cr.set_antialias(cairo.Antialias.BEST)
+        Gtk.render_background(context, cr, 0, 0, width, height)
+        Gtk.render_frame(context, cr, 0, 0, width, height)
 
-            Gtk.render_background(context, cr, *self._buffer_box)
-            Gtk.render_frame(context, cr, *self._buffer_box)
+        if len(self._style_cache) > 8:
+            # heights are animating, don't hoard templates
+            self._style_cache.clear()
+        self._style_cache[height] = (surface, cap)
+        return surface, cap
+
+    def do_render_template(
+        self,
+        cr: cairo.Context,
+        template: cairo.ImageSurface,
+        cap: int,
+        box: Rectangle,
+    ):
+        x, y, width, _ = box
+        template_width = cap * 2 + 1
+
+        # left and right caps as-is
+        for cap_x, source_x in ((x, x), (x + width - cap, x + width - template_width)):
+            cr.save()
+            cr.rectangle(cap_x, y, cap, box.height)
+            cr.clip()
+            cr.set_source_surface(template, source_x, y)
+            cr.paint()
+            cr.restore()
+
+        # the middle column stretched across
+        cr.save()
+        cr.rectangle(x + cap, y, width - cap * 2, box.height)
+        cr.clip()
+        cr.translate(x + cap, y)
+        cr.scale(width - cap * 2, 1)
+        cr.set_source_surface(template, -cap, 0)
+        cast(cairo.SurfacePattern, cr.get_source()).set_filter(cairo.Filter.NEAREST)
+        cr.paint()
+        cr.restore()
+        return
+
+    def do_realize(self, *_):
+        Gtk.DrawingArea.do_realize(self)
+        if window := self.get_window():
+            window.set_pass_through(True)
+        return
+
+    def do_draw(self, cr: cairo.Context):
+        box = self._buffer_box
+        if box.width <= 0 or box.height <= 0:
+            return True
+
+        cr.save()
+        template, cap = self.do_get_style_template(max(1, round(box.height)))
+        if box.width >= cap * 2 + 1:
+            self.do_render_template(cr, template, cap, box)
+        else:
+            # too thin for slicing, render it the slow way
+            context = self.get_style_context()
+            cr.set_antialias(cairo.Antialias.BEST)
+            Gtk.render_background(context, cr, *box)
+            Gtk.render_frame(context, cr, *box)
 
         cr.restore()
         return True
@@ -0,0 +1,180 @@
+import gi
+from functools import cache
+from collections.abc import Callable
+from .common import (
+    Service,
+    GLib,
+    logger,
+    idle_add,
+)
+
+try:
+    gi.require_version("Gst", "1.0")
+    from gi.repository import Gst
+
+    Gst.init(None)
+except (ValueError, ImportError):
+    Gst = None
+
+# everything gets decoded to the same format, so one set of caps fits all
+SOUND_CAPS = "audio/x-raw,format=S16LE,layout=interleaved,rate=48000,channels=2"
+SOUND_BYTES_PER_SECOND = 48000 * 2 * 2
+SOUND_DECODE_POLL = 100_000_000  # ns, how often the decoder checks for errors
+
+
+class Sound:
+    """A sound decoded to raw samples, wrapped once and shared by every playback"""
+
+    __slots__ = ("path", "buffer", "duration")
+
+    def __init__(self, path: str, data: bytes):
+        self.path = path
+        self.buffer = Gst.Buffer.new_wrapped(data)  # type: ignore
+        self.duration = len(data) * Gst.SECOND // SOUND_BYTES_PER_SECOND  # type: ignore
+
+
+def decode_sound(path: str) -> bytes:
+    # BLOCKS. RUN IN A THREAD.
+    pipeline = Gst.parse_launch(  # type: ignore
+        "filesrc name=source ! decodebin ! audioconvert ! audioresample"
+        f" ! {SOUND_CAPS} ! appsink name=sink sync=false"
+    )
+    pipeline.get_by_name("source").set_property("location", path)
+    sink = pipeline.get_by_name("sink")
+    bus = pipeline.get_bus()
+    chunks = []
+
+    pipeline.set_state(Gst.State.PLAYING)  # type: ignore
+    try:
+        while True:
+            if (sample := sink.emit("try-pull-sample", SOUND_DECODE_POLL)) is not None:
+                buffer = sample.get_buffer()
+                chunks.append(buffer.extract_dup(0, buffer.get_size()))
+                continue
+            if sink.get_property("eos"):
+                break
+            if message := bus.pop_filtered(Gst.MessageType.ERROR):  # type: ignore
+                raise message.parse_error()[0]
+    finally:
+        pipeline.set_state(Gst.State.NULL)  # type: ignore
+    return b"".join(chunks)
+
+
+class SoundPlayback:
+    """
+    A single playback of a `Sound`, looped by pushing the same in-memory buffer again,
+    it can be stopped even before the sound is done decoding
+    """
+
+    def __init__(self, loops: int = 1, on_finished: Callable | None = None):
+        self.loops = loops
+        self.finished = False
+        self._on_finished = on_finished
+        self._sound: Sound | None = None
+        self._pipeline = None
+        self._loop = 0
+
+    def start(self, sound: Sound):
+        if self.finished:
+            return
+        self._sound = sound
+        self._pipeline = Gst.parse_launch(  # type: ignore
+            "appsrc name=source format=time ! audioconvert ! audioresample ! autoaudiosink"
+        )
+        source = self._pipeline.get_by_name("source")
+        source.set_property("caps", Gst.Caps.from_string(SOUND_CAPS))  # type: ignore
+        source.connect("need-data", self.on_need_data)
+
+        bus = self._pipeline.get_bus()
+        bus.add_signal_watch()
+        bus.connect("message::eos", lambda *_: self.stop())
+        bus.connect("message::error", self.on_error)
+        self._pipeline.set_state(Gst.State.PLAYING)  # type: ignore
+        return
+
+    def on_need_data(self, source, _):
+        # streaming thread, no gtk in here
+        if self._sound is None or self._loop >= self.loops:
+            source.emit("end-of-stream")
+            return
+        # shares the decoded samples, only the timestamps are its own
+        buffer = self._sound.buffer.copy()
+        buffer.pts = self._loop * self._sound.duration
+        buffer.duration = self._sound.duration
+        self._loop += 1
+        source.emit("push-buffer", buffer)
+        return
+
+    def on_error(self, _, message):
+        error, _debug = message.parse_error()
+        logger.warning(f"[Sounds] Couldn't play {self._sound and self._sound.path}: {error}")
+        return self.stop()
+
+    def stop(self):
+        if self.finished:
+            return
+        self.finished = True
+        if self._pipeline is not None:
+            self._pipeline.set_state(Gst.State.NULL)  # type: ignore
+            self._pipeline.get_bus().remove_signal_watch()
+            self._pipeline = None
+        if self._on_finished:
+            self._on_finished(self)
+        return
+
+
+class SoundService(Service):
+    """
+    Plays short alert sounds in-process, each file is decoded once (off the main thread)
+    the first time it's needed and kept in memory from there on
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._sounds: dict[str, Sound] = {}
+        self._decoding: dict[str, list[SoundPlayback]] = {}
+
+    def play(
+        self, path: str, loops: int = 1, on_finished: Callable | None = None
+    ) -> SoundPlayback:
+        playback = SoundPlayback(loops, on_finished)
+        if Gst is None:
+            logger.warning("[Sounds] GStreamer isn't available, can't play sounds")
+            playback.stop()
+            return playback
+
+        if sound := self._sounds.get(path):
+            playback.start(sound)
+            return playback
+
+        if (waiting := self._decoding.get(path)) is None:
+            waiting = self._decoding[path] = []
+            GLib.Thread.new("fabrika-sound-decoder", self.do_decode, path)
+        waiting.append(playback)
+        return playback
+
+    def do_decode(self, path: str):
+        try:
+            data = decode_sound(path)
+        except GLib.Error as e:
+            logger.warning(f"[Sounds] Couldn't decode {path}: {e}")
+            data = None
+        idle_add(self.do_publish, path, data)
+        return
+
+    def do_publish(self, path: str, data: bytes | None):
+        waiting = self._decoding.pop(path, [])
+        if not data:
+            for playback in waiting:
+                playback.stop()
+            return False
+
+        sound = self._sounds[path] = Sound(path, data)
+        for playback in waiting:
+            playback.start(sound)
+        return False
+
+
+@cache
+def get_sound_service() -> SoundService:
+    return SoundService()
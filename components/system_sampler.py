@@ -0,0 +1,141 @@
+import time
+import threading
+from functools import cache
+from typing import NamedTuple
+from .common import (
+    os,
+    Service,
+    Signal,
+    Property,
+    GLib,
+    logger,
+    idle_add,
+)
+from .snippets.sparkline import RingBuffer
+from .snippets.procfs import SystemCounters, get_cpu_usage, new_metrics_backend
+
+SAMPLER_INTERVAL = 1000  # ms
+SAMPLER_HISTORY = 60  # samples kept per series
+
+
+class SystemSample(NamedTuple):
+    cpu: float  # fractions, 0.0 to 1.0
+    cpu_cores: tuple[float, ...]
+    memory: float
+    swap: float
+    net_rx: float  # bytes per second
+    net_tx: float
+    disk_read: float
+    disk_write: float
+
+
+class SystemSampler(Service):
+    """
+    Samples cpu, memory, swap, network and disk usage in its own thread, samples
+    are handed to the main loop where they get pushed into preallocated ring buffers
+    """
+
+    @Signal
+    def sampled(self, sample: object) -> None: ...
+
+    @Property(int, "read-write", default_value=SAMPLER_INTERVAL)
+    def interval(self) -> int:
+        return self._interval
+
+    @interval.setter
+    def interval(self, value: int):
+        self._interval = max(100, value)
+        # don't wait out the old interval
+        self._wakeup.set()
+        return
+
+    def __init__(self, history: int = SAMPLER_HISTORY, **kwargs):
+        super().__init__(**kwargs)
+        self._interval = SAMPLER_INTERVAL
+        self._wakeup = threading.Event()
+        self._latest: SystemSample | None = None
+        # /proc through persistent fds, psutil if that's not possible
+        self._backend = new_metrics_backend()
+        logger.info(f"[SystemSampler] Using {type(self._backend).__name__}")
+
+        self.cpu = RingBuffer(history)
+        self.cpu_cores = [RingBuffer(history) for _ in range(os.cpu_count() or 1)]
+        self.memory = RingBuffer(history)
+        self.swap = RingBuffer(history)
+        self.net_rx = RingBuffer(history)
+        self.net_tx = RingBuffer(history)
+        self.disk_read = RingBuffer(history)
+        self.disk_write = RingBuffer(history)
+
+        self._thread = GLib.Thread.new("fabrika-system-sampler", self.do_run)
+
+    @property
+    def latest(self) -> SystemSample | None:
+        return self._latest
+
+    # worker side
+    def do_run(self):
+        previous, previous_time = self._backend.read(), time.monotonic()
+        while True:
+            self._wakeup.wait(self._interval / 1000)
+            self._wakeup.clear()
+            try:
+                counters, counters_time = self._backend.read(), time.monotonic()
+                sample = self.do_sample(
+                    previous, counters, max(counters_time - previous_time, 1e-3)
+                )
+            except Exception as e:
+                logger.warning(f"[SystemSampler] Failed to sample: {e}")
+                continue
+            previous, previous_time = counters, counters_time
+            idle_add(self.do_publish, sample)
+
+    def do_sample(
+        self, previous: SystemCounters, counters: SystemCounters, elapsed: float
+    ) -> SystemSample:
+        return SystemSample(
+            get_cpu_usage(previous.cpu, counters.cpu),
+            tuple(
+                get_cpu_usage(*times)
+                for times in zip(previous.cpu_cores, counters.cpu_cores)
+            ),
+            counters.memory,
+            counters.swap,
+            max(counters.net_rx - previous.net_rx, 0) / elapsed,
+            max(counters.net_tx - previous.net_tx, 0) / elapsed,
+            max(counters.disk_read - previous.disk_read, 0) / elapsed,
+            max(counters.disk_write - previous.disk_write, 0) / elapsed,
+        )
+
+    # main thread
+    def do_publish(self, sample: SystemSample):
+        self.cpu.push(sample.cpu)
+        for buffer, usage in zip(self.cpu_cores, sample.cpu_cores):
+            buffer.push(usage)
+        self.memory.push(sample.memory)
+        self.swap.push(sample.swap)
+        self.net_rx.push(sample.net_rx)
+        self.net_tx.push(sample.net_tx)
+        self.disk_read.push(sample.disk_read)
+        self.disk_write.push(sample.disk_write)
+
+        self._latest = sample
+        self.sampled(sample)
+        return False
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+
+def format_rate(rate: float) -> str:
+    return f"{format_size(rate)}/s"
+
+
+@cache
+def get_system_sampler() -> SystemSampler:
+    return SystemSampler()
@@ -1,11 +1,19 @@
-import psutil
 from components.volume import Volume
 from components.common import (
-    invoke_repeater,
+    get_motion_policy,
     bake_progress_bar,
     bake_icon,
+    EventBox,
     Box,
+    Gtk,
 )
+from components.snippets.sparkline import Sparkline
+from components.system_sampler import SystemSample, format_rate, get_system_sampler
+from components.top_processes import TopProcesses
+
+SYSTEM_STATUS_INTERVAL = 1000  # ms
+SYSTEM_STATUS_REDUCED_INTERVAL = 5000  # ms, used in reduced motion mode
+SYSTEM_STATUS_SPARKLINE_WIDTH = 36
 
 
 class SystemStatus(Box):
@@ -23,13 +31,74 @@ class SystemStatus(Box):
             style_classes="ram", child=self.cpu_progress_bar
         )
 
-        self.children = self.ram_progress_bar, Volume()
-        invoke_repeater(1000, self.update_progress_bars, initial_call=True)
+        self.sampler = get_system_sampler()
+        self.cpu_sparkline = Sparkline(
+            self.sampler.cpu,
+            style_classes=["sparkline", "cpu"],
+            size=(SYSTEM_STATUS_SPARKLINE_WIDTH, -1),
+        )
+        # downloads, with uploads dimmed behind them
+        self.net_sparkline = Sparkline(
+            [self.sampler.net_rx, self.sampler.net_tx],
+            max_value=None,
+            style_classes=["sparkline", "net"],
+            size=(SYSTEM_STATUS_SPARKLINE_WIDTH, -1),
+        )
+
+        self.stats_box = EventBox(
+            events="button-press",
+            child=Box(
+                spacing=4,
+                orientation="h",
+                children=(
+                    self.cpu_sparkline,
+                    self.net_sparkline,
+                    self.ram_progress_bar,
+                ),
+            ),
+        )
+        self.stats_box.connect("button-press-event", self.on_stats_clicked)
+
+        # built on first click, from then on it only costs anything while open
+        self.processes_popover: Gtk.Popover | None = None
 
-    def update_progress_bars(self):
-        cpu_usage: float = psutil.cpu_percent()
-        ram_usage: float = psutil.virtual_memory().percent
-        self.cpu_progress_bar.value = cpu_usage / 100
-        self.ram_progress_bar.value = ram_usage / 100
-        self.ram_progress_bar.set_tooltip_text(f"CPU: {cpu_usage}%\nRAM: {ram_usage}%")
-        return True
+        self.children = self.stats_box, Volume()
+
+        get_motion_policy().connect("notify::reduced-motion", self.do_restart_polling)
+        self.sampler.connect("sampled", self.update_progress_bars)
+        self.do_restart_polling()
+
+    def on_stats_clicked(self, _, event):
+        if event.button != 1:
+            return
+        if self.processes_popover is None:
+            self.processes_popover = Gtk.Popover(
+                relative_to=self.stats_box, position=Gtk.PositionType.BOTTOM
+            )
+            self.processes_popover.add(TopProcesses())
+        if self.processes_popover.get_visible():
+            return self.processes_popover.popdown()
+        self.processes_popover.get_child().show_all()
+        return self.processes_popover.popup()
+
+    def do_restart_polling(self, *_):
+        self.sampler.interval = (
+            SYSTEM_STATUS_REDUCED_INTERVAL
+            if get_motion_policy().reduced_motion
+            else SYSTEM_STATUS_INTERVAL
+        )
+        return
+
+    def update_progress_bars(self, _, sample: SystemSample):
+        self.cpu_progress_bar.value = sample.cpu
+        self.ram_progress_bar.value = sample.memory
+        self.cpu_sparkline.queue_draw()
+        self.net_sparkline.queue_draw()
+        self.set_tooltip_text(
+            f"CPU: {sample.cpu:.0%}\n"
+            f"RAM: {sample.memory:.0%}\n"
+            f"Swap: {sample.swap:.0%}\n"
+            f"Net: {format_rate(sample.net_rx)} down, {format_rate(sample.net_tx)} up\n"
+            f"Disk: {format_rate(sample.disk_read)} read, {format_rate(sample.disk_write)} write"
+        )
+        return
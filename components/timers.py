@@ -0,0 +1,199 @@
+import json
+import time
+import math
+from functools import cache
+from typing import NamedTuple
+from .common import (
+    os,
+    Service,
+    Signal,
+    GLib,
+    logger,
+)
+from .sleep_monitor import get_sleep_monitor
+
+TIMERS_PATH = os.path.expanduser("~/.cache/fabrika/timers.json")
+TIMER_DEFAULT_WIDTH = 100  # px, until a widget tells us how wide it really is
+TIMER_MIN_INTERVAL = 0.1  # seconds, short timers on wide bars don't get to spin
+TIMER_MISSED_GRACE = 10 * 60  # seconds, timers that ran out longer ago are dropped
+
+
+class Timer(NamedTuple):
+    id: int
+    duration: float  # seconds
+    deadline: float  # wall clock (unix time), so it survives restarts
+
+    @property
+    def start(self) -> float:
+        return self.deadline - self.duration
+
+    def get_fraction(self, now: float) -> float:
+        return min(max((now - self.start) / self.duration, 0.0), 1.0)
+
+
+class TimerService(Service):
+    """
+    Keeps the running timers (persisted to disk) and wakes up only when one of them
+    would move its progress bar by a pixel or run out, all from a single GLib source
+    """
+
+    @Signal
+    def timer_added(self, timer: object) -> None: ...
+
+    @Signal
+    def timer_changed(self, timer: object) -> None: ...
+
+    @Signal
+    def timer_finished(self, timer: object) -> None: ...
+
+    @Signal
+    def timer_removed(self, timer: object) -> None: ...
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.timers: dict[int, Timer] = {}
+        self._widths: dict[int, dict[int, int]] = {}  # timer id -> widget id -> width
+        self._pixels: dict[int, int] = {}  # last pixel each timer was reported at
+        self._source: int = 0
+        self._next_id = 1
+        # the timeout doesn't count time spent suspended, check the deadlines on resume
+        get_sleep_monitor().connect("resumed", self.on_resumed)
+        self.do_load()
+
+    def do_load(self):
+        try:
+            with open(TIMERS_PATH) as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, json.JSONDecodeError) as e:
+            logger.warning(f"[Timers] Couldn't load saved timers: {e}")
+            return
+
+        now = time.time()
+        missed = []
+        for item in data:
+            try:
+                timer = Timer(int(item["id"]), float(item["duration"]), float(item["deadline"]))
+                if timer.duration <= 0:
+                    raise ValueError(timer.duration)
+            except (KeyError, TypeError, ValueError):
+                continue
+            self._next_id = max(self._next_id, timer.id + 1)
+            if timer.deadline > now:
+                self.timers[timer.id] = timer
+            elif now - timer.deadline <= TIMER_MISSED_GRACE:
+                missed.append(timer)
+
+        if missed:
+            # ran out while the shell was down, still worth a ring (once it's listening)
+            GLib.idle_add(self.do_finish_missed, missed)
+            self.do_save()
+        return self.do_arm()
+
+    def do_save(self):
+        try:
+            os.makedirs(os.path.dirname(TIMERS_PATH), exist_ok=True)
+            with open(TIMERS_PATH + ".tmp", "w") as f:
+                json.dump([timer._asdict() for timer in self.timers.values()], f)
+            os.replace(TIMERS_PATH + ".tmp", TIMERS_PATH)
+        except OSError as e:
+            logger.warning(f"[Timers] Couldn't save timers: {e}")
+        return
+
+    def do_finish_missed(self, missed: list[Timer]) -> bool:
+        for timer in missed:
+            self.timer_finished(timer)
+        return False
+
+    def start(self, duration: float) -> Timer:
+        timer = Timer(self._next_id, duration, time.time() + duration)
+        self._next_id += 1
+        self.timers[timer.id] = timer
+        self.do_save()
+        self.timer_added(timer)
+        self.do_arm()
+        return timer
+
+    def cancel(self, timer_id: int):
+        if (timer := self.timers.pop(timer_id, None)) is None:
+            return
+        self._widths.pop(timer_id, None)
+        self._pixels.pop(timer_id, None)
+        self.do_save()
+        self.timer_removed(timer)
+        return self.do_arm()
+
+    def set_width(self, timer_id: int, widget_id: int, width: int):
+        if timer_id not in self.timers:
+            return
+        widths = self._widths.setdefault(timer_id, {})
+        if widths.get(widget_id) == width:
+            return
+        widths[widget_id] = width
+        return self.do_arm()
+
+    def unset_width(self, timer_id: int, widget_id: int):
+        if (widths := self._widths.get(timer_id)) is None:
+            return
+        if widths.pop(widget_id, None) is None:
+            return
+        return self.do_arm()
+
+    def get_width(self, timer: Timer) -> int:
+        # several widgets might show the same timer, the widest one sets the pace
+        return max(self._widths.get(timer.id, {}).values(), default=TIMER_DEFAULT_WIDTH)
+
+    def get_pixel(self, timer: Timer, now: float) -> int:
+        return int(timer.get_fraction(now) * self.get_width(timer))
+
+    def get_next_wakeup(self, timer: Timer, now: float) -> float:
+        step = max(timer.duration / max(self.get_width(timer), 1), TIMER_MIN_INTERVAL)
+        elapsed = max(now - timer.start, 0.0)
+        return min(timer.start + (math.floor(elapsed / step) + 1) * step, timer.deadline)
+
+    def do_arm(self):
+        if self._source:
+            GLib.source_remove(self._source)
+            self._source = 0
+        if not self.timers:
+            return
+
+        now = time.time()
+        wakeup = min(self.get_next_wakeup(timer, now) for timer in self.timers.values())
+        # recomputed from the absolute deadline every time, so nothing drifts
+        self._source = GLib.timeout_add(
+            max(math.ceil((wakeup - now) * 1000), 1), self.do_wake
+        )
+        return
+
+    def on_resumed(self, *_):
+        if self._source:
+            GLib.source_remove(self._source)
+        self.do_wake()
+        return
+
+    def do_wake(self) -> bool:
+        self._source = 0
+        now = time.time()
+
+        for timer in tuple(self.timers.values()):
+            if now >= timer.deadline:
+                del self.timers[timer.id]
+                self._widths.pop(timer.id, None)
+                self._pixels.pop(timer.id, None)
+                self.do_save()
+                self.timer_finished(timer)
+                continue
+            # only bother the widgets whose bar actually moved
+            if (pixel := self.get_pixel(timer, now)) != self._pixels.get(timer.id):
+                self._pixels[timer.id] = pixel
+                self.timer_changed(timer)
+
+        self.do_arm()
+        return False
+
+
+@cache
+def get_timer_service() -> TimerService:
+    return TimerService()
@@ -0,0 +1,146 @@
+import threading
+from functools import cache
+from itertools import zip_longest
+from typing import NamedTuple
+from .common import (
+    Service,
+    Signal,
+    Label,
+    Box,
+    GLib,
+    logger,
+    idle_add,
+)
+from .snippets.procfs import ProcessInfo, ProcessTable
+from .system_sampler import format_size
+
+TOP_PROCESSES_INTERVAL = 2000  # ms, only while the list is on screen
+TOP_PROCESSES_ROWS = 6  # per section
+
+
+class ProcessRowData(NamedTuple):
+    pid: int
+    name: str
+    cmdline: str
+    cpu: float
+    rss: int
+
+    @staticmethod
+    def from_info(info: ProcessInfo) -> "ProcessRowData":
+        return ProcessRowData(info.pid, info.name, info.cmdline, info.cpu, info.rss)
+
+
+class ProcessMonitor(Service):
+    """
+    Keeps a `ProcessTable` up-to-date in a worker thread while started, publishing
+    only the top few processes by cpu and memory usage
+    """
+
+    @Signal
+    def updated(self, by_cpu: object, by_memory: object) -> None: ...
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._table = ProcessTable()
+        self._users = 0
+        self._active = threading.Event()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._users += 1
+        if self._thread is None:
+            self._thread = GLib.Thread.new("fabrika-process-monitor", self.do_run)
+        self._active.set()
+        self._wakeup.set()  # fresh numbers right away
+        return
+
+    def stop(self):
+        self._users = max(0, self._users - 1)
+        if not self._users:
+            self._active.clear()
+        return
+
+    def do_run(self):
+        while True:
+            self._active.wait()
+            try:
+                self._table.update()
+                by_cpu = tuple(
+                    map(
+                        ProcessRowData.from_info,
+                        self._table.get_top("cpu", TOP_PROCESSES_ROWS),
+                    )
+                )
+                by_memory = tuple(
+                    map(
+                        ProcessRowData.from_info,
+                        self._table.get_top("rss", TOP_PROCESSES_ROWS),
+                    )
+                )
+                idle_add(self.do_publish, by_cpu, by_memory)
+            except Exception as e:
+                logger.warning(f"[ProcessMonitor] Failed to update processes: {e}")
+            self._wakeup.wait(TOP_PROCESSES_INTERVAL / 1000)
+            self._wakeup.clear()
+
+    def do_publish(self, by_cpu, by_memory):
+        self.updated(by_cpu, by_memory)
+        return False
+
+
+class ProcessRow(Box):
+    def __init__(self, **kwargs):
+        super().__init__(spacing=8, orientation="h", style_classes="process", **kwargs)
+        self._name_label = Label(ellipsization="end", h_align="start", h_expand=True)
+        self._value_label = Label(style_classes="value", h_align="end")
+        self.children = self._name_label, self._value_label
+        self._data: tuple[int, str, str] | None = None
+
+    def update(self, data: ProcessRowData | None, value: str):
+        if data is None:
+            self._data = None
+            return self.hide()
+
+        # same process, same text? leave the widgets alone
+        if (data.pid, data.name, value) == self._data:
+            return
+        if self._data is None or self._data[0] != data.pid:
+            self._name_label.set_label(data.name)
+            self.set_tooltip_text(f"{data.cmdline} ({data.pid})")
+        self._value_label.set_label(value)
+        self._data = (data.pid, data.name, value)
+        return self.show()
+
+
+class TopProcesses(Box):
+    def __init__(self, **kwargs):
+        super().__init__(name="top-processes", spacing=4, orientation="v", **kwargs)
+        self._cpu_rows = [ProcessRow() for _ in range(TOP_PROCESSES_ROWS)]
+        self._memory_rows = [ProcessRow() for _ in range(TOP_PROCESSES_ROWS)]
+        self.children = (
+            Label("CPU", style_classes="title", h_align="start"),
+            *self._cpu_rows,
+            Label("Memory", style_classes="title", h_align="start"),
+            *self._memory_rows,
+        )
+
+        self._monitor = get_process_monitor()
+        self._monitor.connect("updated", self.on_updated)
+        # nothing gets sampled unless the list is actually showing
+        self.connect("map", lambda *_: self._monitor.start())
+        self.connect("unmap", lambda *_: self._monitor.stop())
+
+    def on_updated(self, _, by_cpu: tuple, by_memory: tuple):
+        if not self.get_mapped():
+            return
+        for row, data in zip_longest(self._cpu_rows, by_cpu):
+            row.update(data, f"{data.cpu:.1%}" if data else "")
+        for row, data in zip_longest(self._memory_rows, by_memory):
+            row.update(data, format_size(data.rss) if data else "")
+        return
+
+
+@cache
+def get_process_monitor() -> ProcessMonitor:
+    return ProcessMonitor()
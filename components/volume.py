@@ -1,9 +1,16 @@
-from .common import Audio, EventBox, bake_icon, bake_progress_bar
+from .common import EventBox, bake_icon, bake_progress_bar
+from .audio_state import get_audio_state
+
+VOLUME_SCROLL_STEP = 10
 
 
 class Volume(EventBox):
     def __init__(self, **kwargs):
-        super().__init__(events="scroll", on_scroll_event=self.on_scroll, **kwargs)
+        super().__init__(
+            events=["scroll", "smooth-scroll"],
+            on_scroll_event=self.on_scroll,
+            **kwargs,
+        )
 
         self.volume_icon = bake_icon(
             icon_name="audio-volume-high-symbolic", icon_size=12
@@ -11,16 +18,21 @@ class Volume(EventBox):
         self.progress_bar = bake_progress_bar(
             style_classes="volume", child=self.volume_icon
         )
-        self.audio = Audio(notify_speaker=self.on_speaker_changed)
+        self.audio = get_audio_state()
+        self.audio.connect("notify::speaker-volume", self.on_volume_changed)
+        self.audio.connect("speaker-changed", self.on_volume_changed)
+        self.on_volume_changed()
 
         self.children = self.progress_bar
 
     def on_scroll(self, _, event):
         match event.direction:
             case 0:
-                self.audio.speaker.volume += 10
+                self.audio.speaker_volume += VOLUME_SCROLL_STEP
             case 1:
-                self.audio.speaker.volume -= 10
+                self.audio.speaker_volume -= VOLUME_SCROLL_STEP
+            case 4:  # smooth scrolling (touchpads), many tiny steps
+                self.audio.speaker_volume -= event.delta_y * VOLUME_SCROLL_STEP
         return
 
     def set_volume_icon(self, volume: float):
@@ -39,18 +51,7 @@ class Volume(EventBox):
             12,
         )
 
-    def on_speaker_changed(self, *_):
-        if not self.audio.speaker:
-            return
-        volume = self.audio.speaker.volume / 100
+    def on_volume_changed(self, *_):
+        volume = self.audio.speaker_volume / 100
         self.progress_bar.value = volume
-        self.set_volume_icon(volume)
-        return self.audio.speaker.bind(
-            "volume",
-            "value",
-            self.progress_bar,
-            lambda _, v: (
-                (vol := v / 100),
-                self.set_volume_icon(vol),
-            )[0],
-        )
+        return self.set_volume_icon(volume)
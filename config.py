@@ -5,6 +5,7 @@ from components.power_button import PowerButton
 from components.dashboard import Dashboard
 from components.datetime import DateTime
 from components.players import Players
+from components.power_saver import PowerSaver
 from components.common import (
     logger,
     truncate,
@@ -14,6 +15,8 @@ from components.common import (
     get_relative_path,
     invoke_repeater,
     remove_handler,
+    get_frame_monitor,
+    get_motion_policy,
     FormattedString,
     ActiveWindow,
     SystemTray,
@@ -22,6 +25,7 @@ from components.common import (
     Overlay,
     Window,
     Box,
+    Gtk,
 )
 
 
@@ -144,11 +148,50 @@ def apply_style(*args):
     )
 
 
+@Application.action()
+def frame_stats(reset: str | bool = False):
+    # arguments come in as strings, "false" shouldn't reset anything
+    if isinstance(reset, str):
+        reset = reset.strip().lower() in ("1", "true", "yes", "reset")
+    monitor = get_frame_monitor()
+    stats = monitor.get_stats()
+    logger.info(f"[Fabrika] Frame stats: {stats}")
+    if reset:
+        monitor.reset()
+    return stats
+
+
+@Application.action()
+def toggle_reduced_motion(mode: str = ""):
+    # no mode means flip the current state, "auto" hands it back to the power saver
+    if mode:
+        power_saver.mode = mode
+    else:
+        power_saver.toggle()
+    return get_motion_policy().reduced_motion
+
+
+def apply_reduced_motion_style(*_):
+    reduced = get_motion_policy().reduced_motion
+    for window in Gtk.Window.list_toplevels():
+        context = window.get_style_context()
+        if reduced:
+            context.add_class("reduced-motion")
+        else:
+            context.remove_class("reduced-motion")
+    return
+
+
 @(Application.action() if LAUNCHER_ENABLED else lambda *_: ...)
 def toggle_launcher():
     launcher.toggle()
 
 
+@(Application.action() if NOTIFICATIONS_ENABLED else lambda *_: ...)
+def filter_notifications(query: str = ""):
+    notifications_view.set_filter(query)
+
+
 @(Application.action() if OSD_ENABLED else lambda *_: ...)
 def toggle_osd():
     osd.toggle()
@@ -202,6 +245,7 @@ app = Application("fabrika-shell", corners, bar, clock)
 if NOTIFICATIONS_ENABLED:
     from components.notifications import NotificationsView
 
+    notifications_view = NotificationsView()
     app.add_window(
         Window(
             layer="top",
@@ -210,7 +254,7 @@ if NOTIFICATIONS_ENABLED:
             all_visible=False,
         ).build(
             lambda win, _: win.add(
-                NotificationsView().build(
+                notifications_view.build(
                     lambda notifs, _: notifs.bind("visible", "visible", win)
                 )
             )
@@ -266,6 +310,10 @@ if OSD_ENABLED:
     ).build(lambda win: win.add(OSD(window=win)))
     app.add_window(osd)
 
+power_saver = PowerSaver()
+get_motion_policy().connect("notify::reduced-motion", apply_reduced_motion_style)
+apply_reduced_motion_style()
+
 style_monitor = monitor_file(
     get_relative_path("./style/"), apply_style, initial_call=True
 )